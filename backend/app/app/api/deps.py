@@ -3,28 +3,32 @@ from collections.abc import AsyncGenerator
 import json
 from urllib.request import urlopen
 from uuid import UUID
-from app.auth.decode_verify_jwt import verify_cognito_token
+from app.auth.cognito import cognito_client
+from app.auth.middleware import AuthContext, get_auth_context
+from app.auth.principal_cache import principal_cache
 from fastapi import Depends, HTTPException
+import httpx
 import jwt
 import rsa
 from app.core import security
 import requests
-from app.utils.neural_searcher import NeuralSearcher
+from app.utils.embedding_batcher import embedding_batcher
+from app.utils.embedding_cache import CachedOpenAIEmbeddings, embedding_cache
+from app.utils.neural_searcher import NeuralSearcher, NeuralSearcherRegistry
 from fastapi.security import OAuth2PasswordBearer
 from app.models.user_model import User
 from app import crud
 from app.core.config import settings
+from app.db.collection_profiles import get_collection_profile
+from app.db.redis import redis_pool
 from app.db.session import SessionLocal
 from qdrant_client import QdrantClient
 from sqlmodel.ext.asyncio.session import AsyncSession
-import redis.asyncio as aioredis
 from redis.asyncio import Redis
 from langchain.embeddings import OpenAIEmbeddings
 from langchain.chat_models import ChatOpenAI
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from app.schemas.common_schema import IDecodedToken
-from aiobotocore.session import get_session
-from aiobotocore.config import AioConfig
 from pydantic import EmailStr
 
 
@@ -34,13 +38,7 @@ reusable_oauth2 = OAuth2PasswordBearer(
 
 
 async def get_redis_client() -> Redis:
-    redis = await aioredis.from_url(
-        f"redis://{settings.REDIS_HOST}:{settings.REDIS_PORT}",
-        max_connections=10,
-        encoding="utf8",
-        decode_responses=True,
-    )
-    return redis
+    return redis_pool.get_client()
 
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
@@ -56,7 +54,7 @@ def get_sync_qdrant_client() -> QdrantClient:
 
 
 def get_langchain_embeddings() -> OpenAIEmbeddings:
-    embeddings: OpenAIEmbeddings = OpenAIEmbeddings(
+    embeddings: OpenAIEmbeddings = CachedOpenAIEmbeddings(
         openai_api_key=settings.OPENAI_API_KEY
     )
     return embeddings
@@ -72,90 +70,102 @@ def get_chat_openai() -> ChatOpenAI:
 
 
 
+neural_searchers = NeuralSearcherRegistry(
+    local_index_dir=settings.VECTOR_INDEX_DIR
+    if settings.VECTOR_SEARCH_BACKEND == "local"
+    else None,
+    lexical_index_dir=settings.VECTOR_INDEX_DIR,
+    reload_interval=settings.VECTOR_INDEX_RELOAD_INTERVAL,
+    openai_api_key=settings.OPENAI_API_KEY,
+    url=settings.QDRANT_CLOUD_URL,
+    api_key=settings.QDRANT_CLOUD_API_KEY,
+    host=settings.QDRANT_HOST,
+    is_cloud_qdrant=True,
+    prefer_grpc=settings.QDRANT_PREFER_GRPC,
+    embedding_cache=embedding_cache,
+    embedding_batcher=embedding_batcher,
+    rescore=get_collection_profile(settings.QDRANT_COLLECTION_PROFILE).rescore,
+    limits=httpx.Limits(
+        max_connections=settings.QDRANT_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.QDRANT_MAX_CONNECTIONS,
+    ),
+)
+
+
 def get_neural_searcher(collection_name: str) -> NeuralSearcher:
     def get_searcher() -> NeuralSearcher:
-        searcher: NeuralSearcher = NeuralSearcher(
-            collection_name,
-            openai_api_key=settings.OPENAI_API_KEY,
-            url=settings.QDRANT_CLOUD_URL,
-            api_key=settings.QDRANT_CLOUD_API_KEY,
-            host=settings.QDRANT_HOST,
-            is_cloud_qdrant=True,
-        )
-        return searcher
+        return neural_searchers.get(collection_name)
 
     return get_searcher
 
 
 
-async def get_user_id(token: str = Depends(reusable_oauth2)) -> IDecodedToken:
+async def _resolve_decoded_token(decoded_token: dict) -> IDecodedToken:
+    # Get the user attributes from the decoded token
+    user_id = decoded_token["sub"]
+    username = decoded_token["username"]
+    cached_decoded_token = await principal_cache.get_decoded_token(user_id)
+    if cached_decoded_token is not None:
+        return cached_decoded_token
+    client = await cognito_client.get_client()
+    auth_response = await client.admin_get_user(
+        UserPoolId=settings.COGNITO_POOL_ID,
+        Username=str(username),
+    )
+    email: EmailStr = next(
+        (
+            attr["Value"]
+            for attr in auth_response["UserAttributes"]
+            if attr["Name"] == "email"
+        ),
+        None,
+    )
+    resolved_token = IDecodedToken(user_id=user_id, username=username, email=email)
+    await principal_cache.set_decoded_token(user_id, resolved_token)
+    return resolved_token
+
+
+async def resolve_user(decoded_token: dict) -> User | None:
+    user_id = decoded_token["sub"]
+    user = await principal_cache.get_user(user_id)
+    if user is None:
+        resolved_token = await _resolve_decoded_token(decoded_token)
+        user = await crud.user.get_by_email(email=resolved_token.email)
+        if user is not None:
+            await principal_cache.set_user(user_id, user)
+    return user
+
+
+async def get_user_id(
+    token: str = Depends(reusable_oauth2),
+    auth_context: AuthContext = Depends(get_auth_context),
+) -> IDecodedToken:
     if not token:
         raise HTTPException(status_code=401, detail='You missed the bearer token')
+    if not auth_context.is_authenticated:
+        raise HTTPException(status_code=401, detail="Could not validate credentials")
     try:
-        # Decode and verify the token using decode-verify-jwt
-        decoded_token = verify_cognito_token(token)
-        # Get the user attributes from the decoded token            
-        user_id = decoded_token["sub"]
-        username = decoded_token["username"]
-        session = get_session()
-        async with session.create_client(
-            "cognito-idp",
-            region_name=settings.COGNITO_REGION,
-            aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-            config=AioConfig(max_pool_connections=128),
-        ) as client:
-            auth_response = await client.admin_get_user(
-                UserPoolId=settings.COGNITO_POOL_ID,
-                Username=str(username),
-            )
-            email = next(
-                (
-                    attr["Value"]
-                    for attr in auth_response["UserAttributes"]
-                    if attr["Name"] == "email"
-                ),
-                None,
-            )            
+        # The token was already decoded and verified by AuthContextMiddleware
+        resolved_token = await _resolve_decoded_token(auth_context.claims)
     except Exception as e:
         print(e)
         raise HTTPException(status_code=401, detail=f"{e}")
         
-    return IDecodedToken(user_id=user_id, username=username, email=email)
+    return resolved_token
 
 
-async def get_current_user(token: str = Depends(reusable_oauth2)) -> User:
+async def get_current_user(
+    token: str = Depends(reusable_oauth2),
+    auth_context: AuthContext = Depends(get_auth_context),
+) -> User:
     user: User | None = None
     if not token:
         raise HTTPException(status_code=401, detail='You missed the bearer token')
+    if not auth_context.is_authenticated:
+        raise HTTPException(status_code=401, detail="Could not validate credentials")
     try:
-        # Decode and verify the token using decode-verify-jwt
-        decoded_token = verify_cognito_token(token)
-        # Get the user attributes from the decoded token            
-        user_id = decoded_token["sub"]
-        username = decoded_token["username"]
-        session = get_session()
-        async with session.create_client(
-            "cognito-idp",
-            region_name=settings.COGNITO_REGION,
-            aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-            config=AioConfig(max_pool_connections=128),
-        ) as client:
-            auth_response = await client.admin_get_user(
-                UserPoolId=settings.COGNITO_POOL_ID,
-                Username=str(username),
-            )
-            email: EmailStr = next(
-                (
-                    attr["Value"]
-                    for attr in auth_response["UserAttributes"]
-                    if attr["Name"] == "email"
-                ),
-                None,
-            )
-            user = await crud.user.get_by_email(email=email)
-        
+        # The token was already decoded and verified by AuthContextMiddleware
+        user = await resolve_user(auth_context.claims)
     except Exception as e:
         print(e)
         raise HTTPException(status_code=401, detail=f"{e}")
@@ -166,4 +176,4 @@ async def get_current_user(token: str = Depends(reusable_oauth2)) -> User:
     if user.is_active is False: 
         raise HTTPException(status_code=400, detail="Inactive user")    
     
-    return user
\ No newline at end of file
+    return user
@@ -4,6 +4,7 @@ from app.api.v1.endpoints import (
     qdrant,
     user,
     auth,
+    metrics,
 )
 
 api_router = APIRouter()
@@ -11,3 +12,4 @@ api_router.include_router(auth.router, prefix="/auth", tags=["auth"])
 api_router.include_router(user.router, prefix="/user", tags=["user"])
 api_router.include_router(openai.router, prefix="/openai", tags=["openai"])
 api_router.include_router(qdrant.router, prefix="/qdrant", tags=["qdrant"])
+api_router.include_router(metrics.router, prefix="/metrics", tags=["metrics"])
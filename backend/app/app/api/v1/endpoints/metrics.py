@@ -0,0 +1,39 @@
+from app.api.deps import get_current_user
+from app.auth.cognito import cognito_client
+from app.auth.principal_cache import principal_cache
+from app.auth.token_cache import revocation_check_cache, verified_claims_cache
+from app.core.security import password_hash_pool
+from app.db.redis import redis_pool
+from app.models.user_model import User
+from app.schemas.response_schema import IGetResponseBase, create_response
+from app.utils.embedding_batcher import embedding_batcher
+from app.utils.embedding_cache import embedding_cache
+from app.utils.rate_limiter import rate_limit_store
+from app.utils.search_cache import search_cache
+from fastapi import APIRouter, Depends, HTTPException
+
+router = APIRouter()
+
+
+@router.get("")
+async def get_worker_metrics(
+    current_user: User = Depends(get_current_user),
+) -> IGetResponseBase[dict]:
+    """
+    Gets the cache, pool and rate limiter counters of the worker that serves the request
+    """
+    if not current_user.is_superuser:
+        raise HTTPException(status_code=403, detail="Not enough privileges")
+    data = {
+        "verified_claims_cache": verified_claims_cache.cache_info(),
+        "revocation_check_cache": revocation_check_cache.cache_info(),
+        "principal_cache": principal_cache.cache_info(),
+        "embedding_cache": embedding_cache.cache_info(),
+        "embedding_batcher": embedding_batcher.stats(),
+        "search_cache": search_cache.cache_info(),
+        "cognito_pool": cognito_client.pool_stats(),
+        "password_hash_pool": password_hash_pool.stats(),
+        "redis_pool": redis_pool.pool_stats(),
+        "rate_limiter": rate_limit_store.stats(),
+    }
+    return create_response(data=data)
@@ -3,13 +3,22 @@ from app.models.user_model import User
 from app.schemas.common_schema import IChatCompletionResponse
 from app.schemas.response_schema import IPostResponseBase, create_response
 from app.utils.chatgpt import get_embedding, num_tokens_from_messages
+from app.utils.embedding_batcher import embedding_batcher
+from app.utils.embedding_cache import normalize_text
+from app.core.config import settings
+from app.utils.vector_response import (
+    VECTOR_RESPONSES,
+    vector_media_type,
+    vectors_response,
+)
 from asyncer import asyncify
-from fastapi import APIRouter, Body, Depends
+from fastapi import APIRouter, Body, Depends, Header, Response
 from langchain import LLMChain
 from langchain.embeddings import OpenAIEmbeddings
 import openai
+from typing import Literal
 from pydantic import BaseModel
-from fastapi_limiter.depends import RateLimiter
+from app.utils.rate_limiter import HybridRateLimiter
 from app.api.deps import get_current_user, get_langchain_embeddings, get_chat_openai
 from langchain.chat_models import ChatOpenAI
 from langchain.schema import AIMessage, HumanMessage, SystemMessage
@@ -29,12 +38,15 @@ class Input(BaseModel):
 
 class Inputs(BaseModel):
     prompts: list[str]
+    encoding_format: Literal["float", "base64"] = "float"
+    # Collapse every run of whitespace, otherwise only newlines become spaces
+    normalize: bool = False
 
 
 @router.post(
     "/num_tokens_from_messages",
     dependencies=[
-        Depends(RateLimiter(times=200, hours=24)),
+        Depends(HybridRateLimiter(times=200, hours=24)),
     ],
 )
 async def get_num_tokens_from_messages(
@@ -56,22 +68,47 @@ async def get_num_tokens_from_messages(
 @router.post(
     "/embeddings",
     dependencies=[
-        Depends(RateLimiter(times=200, hours=24)),
+        Depends(HybridRateLimiter(times=200, hours=24)),
     ],
+    response_model=IPostResponseBase[list[list[float]] | list[str]],
+    responses=VECTOR_RESPONSES,
 )
 async def generate_embeddings(
     body: Inputs,
+    accept: str | None = Header(None),
     current_user: User = Depends(get_current_user),
     embeddings: OpenAIEmbeddings = Depends(get_langchain_embeddings),
-) -> IPostResponseBase[list[list[float]]]:
-    doc_result = await asyncify(embeddings.embed_documents)(texts=body.prompts)
-    return create_response(data=doc_result, message="Embedding got succesfully")
+) -> Response:
+    """
+    Embeds the prompts. The `Accept` header picks JSON (default),
+    `application/x-npy`, `application/octet-stream` or `application/msgpack`,
+    `encoding_format="base64"` sends base64 float32 vectors in the JSON.
+    Prompts are embedded as sent (newlines as spaces, like langchain's
+    `embed_documents`) unless `normalize` is set, repeated prompts are
+    embedded once.
+    """
+    media_type = vector_media_type(accept)
+    if body.normalize:
+        texts = [normalize_text(prompt) for prompt in body.prompts]
+    else:
+        texts = [prompt.replace("\n", " ") for prompt in body.prompts]
+    doc_result = await embedding_batcher.embed_chunked(
+        texts,
+        model=embeddings.document_model_name,
+        max_chunk_tokens=settings.EMBEDDINGS_CHUNK_MAX_TOKENS,
+    )
+    return vectors_response(
+        doc_result,
+        media_type=media_type,
+        encoding_format=body.encoding_format,
+        message="Embedding got succesfully",
+    )
 
 
 @router.post(
     "/text_generation",
     dependencies=[
-        Depends(RateLimiter(times=200, hours=24)),
+        Depends(HybridRateLimiter(times=200, hours=24)),
     ],
 )
 async def text_generation_prediction(
@@ -96,7 +133,7 @@ async def text_generation_prediction(
 @router.post(
     "/chain",
     dependencies=[
-        Depends(RateLimiter(times=200, hours=24)),
+        Depends(HybridRateLimiter(times=200, hours=24)),
     ],
 )
 async def generate_template_chain(
@@ -1,29 +1,140 @@
 from app.api.deps import get_current_user, get_neural_searcher
 from app.models.user_model import User
 from app.schemas.response_schema import IPostResponseBase, create_response
+from typing import Any
+from uuid import UUID
+from app.schemas.search_schema import ISearchHit, ISearchMode, ISearchParams
+from app.utils.embedding_cache import normalize_text
 from app.utils.neural_searcher import NeuralSearcher
-from asyncer import asyncify
-from fastapi import APIRouter, Depends
-from fastapi_limiter.depends import RateLimiter
+from app.utils.search_cache import search_cache
+from fastapi import APIRouter, Body, Depends, HTTPException
+from pydantic import BaseModel, Field
+from app.utils.rate_limiter import HybridRateLimiter
 
 router = APIRouter()
 
 
+def check_search_mode(neural_seacher: NeuralSearcher, params: ISearchParams) -> None:
+    if params.mode != ISearchMode.dense and neural_seacher.lexical_index is None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"{params.mode.value} search is not available for this collection",
+        )
+
+
+class SearchBatchInput(BaseModel):
+    prompts: list[str] = Field(..., min_items=1, max_items=100)
+    params: ISearchParams = ISearchParams()
+
+
+class SimilarInput(BaseModel):
+    # More points averaged with the one of the path
+    point_ids: list[int | UUID] = Field([], max_items=20)
+    params: ISearchParams = ISearchParams()
+
+
 @router.post(
     "/search",
     dependencies=[
-        Depends(RateLimiter(times=100, hours=24)),
+        Depends(HybridRateLimiter(times=100, hours=24)),
     ],
 )
 async def search_on_vector_db(
     prompt: str = "Good food",
+    with_scores: bool = False,
+    params: ISearchParams = Body(ISearchParams()),
     neural_seacher: NeuralSearcher = Depends(get_neural_searcher("my_docs")),
     current_user: User = Depends(get_current_user),
-) -> IPostResponseBase[list[dict]]:
+) -> IPostResponseBase[list[dict[str, Any]] | list[ISearchHit]]:
     """
     Gets the nearest objects based on the prompt
+
+    Returns their payloads, or with `with_scores` the hits with point id,
+    score and payload
+
+    The optional body sets the top-k (limit/offset), a minimum score, the
+    payload fields to return, the HNSW ef / exact search trade-off and a
+    filter on the indexed payload keys (product_id, user_id, score, n_tokens).
+    The lexical mode (BM25) answers keyword queries without an embedding call,
+    the hybrid mode fuses dense and lexical results
+    """
+    check_search_mode(neural_seacher, params)
+
+    async def search() -> list[dict]:
+        hits = await neural_seacher.asearch(
+            text=prompt, user_id=current_user.id, params=params
+        )
+        return [hit.dict() for hit in hits]
+
+    hits = await search_cache.get_or_search(
+        collection_name=neural_seacher.collection_name,
+        query={"text": normalize_text(prompt), **params.dict()},
+        search=search,
+    )
+    if not with_scores:
+        hits = [hit["payload"] for hit in hits]
+
+    return create_response(data=hits)
+
+
+@router.post(
+    "/search_batch",
+    dependencies=[
+        Depends(HybridRateLimiter(times=100, hours=24)),
+    ],
+)
+async def search_batch_on_vector_db(
+    body: SearchBatchInput,
+    neural_seacher: NeuralSearcher = Depends(get_neural_searcher("my_docs")),
+    current_user: User = Depends(get_current_user),
+) -> IPostResponseBase[list[list[ISearchHit]]]:
+    """
+    Gets the nearest objects of many prompts with a single embedding call and
+    a single batch search, results are in the same order as the prompts
+    """
+    check_search_mode(neural_seacher, body.params)
+
+    hits = await neural_seacher.asearch_batch(
+        texts=body.prompts, user_id=current_user.id, params=body.params
+    )
+
+    return create_response(data=hits)
+
+
+@router.post(
+    "/similar/{point_id}",
+    dependencies=[
+        Depends(HybridRateLimiter(times=100, hours=24)),
+    ],
+)
+async def search_similar_on_vector_db(
+    point_id: int | UUID,
+    body: SimilarInput = SimilarInput(),
+    neural_seacher: NeuralSearcher = Depends(get_neural_searcher("my_docs")),
+    current_user: User = Depends(get_current_user),
+) -> IPostResponseBase[list[ISearchHit]]:
     """
+    Gets the objects most similar to a stored one (or to the average of several)
+    reusing their vectors, without an embedding call. The search mode is ignored
+    """
+    point_ids = list(
+        dict.fromkeys(
+            str(example_id) if isinstance(example_id, UUID) else example_id
+            for example_id in [point_id, *body.point_ids]
+        )
+    )
+
+    async def search() -> list[dict]:
+        try:
+            hits = await neural_seacher.asimilar(point_ids, params=body.params)
+        except KeyError:
+            raise HTTPException(status_code=404, detail="Point not found")
+        return [hit.dict() for hit in hits]
 
-    hits = await asyncify(neural_seacher.search)(text=prompt, user_id=current_user.id)
+    hits = await search_cache.get_or_search(
+        collection_name=neural_seacher.collection_name,
+        query={"similar": point_ids, **body.params.dict()},
+        search=search,
+    )
 
     return create_response(data=hits)
@@ -1,35 +1,35 @@
 from typing import Optional
 from fastapi import HTTPException
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from jose import jwt, jwk, JWTError
-from jose.utils import base64url_decode
+from jose import jwt, JWTError
 from starlette.requests import Request
 from starlette.status import HTTP_403_FORBIDDEN
-from app.auth.auth_schema import JWKS, JWTAuthorizationCredentials
-from app.core.config import settings
-import boto3
+from app.auth.auth_schema import JWTAuthorizationCredentials
+from app.auth.cognito import cognito_client
+from app.auth.middleware import get_auth_context
+from app.auth.token_cache import revocation_check_cache
 
 
 class JWTBearer(HTTPBearer):
-    def __init__(self, jwks: JWKS, auto_error: bool = True):
+    def __init__(self, auto_error: bool = True):
         super().__init__(auto_error=auto_error)
-        self.cognito = boto3.client(
-            'cognito-idp', region_name=settings.COGNITO_REGION)
-        self.kid_to_jwk = {jwk["kid"]: jwk for jwk in jwks.keys}
 
-    def verify_jwk_token(self, jwt_credentials: JWTAuthorizationCredentials) -> bool:
+    async def is_token_allowed(self, jwt_token: str) -> bool:
+        # validate if the user is still allowed to login.
+        # If disabled or deleted from cognito tokens are still valid
+        # for some time, so the answer is reused for a short window only.
+        allowed = revocation_check_cache.get(jwt_token)
+        if allowed is not None:
+            return allowed
+        client = await cognito_client.get_client()
         try:
-            public_key = self.kid_to_jwk[jwt_credentials.header["kid"]]
-        except KeyError:
-            raise HTTPException(
-                status_code=HTTP_403_FORBIDDEN, detail="JWK public key not found"
-            )
-
-        key = jwk.construct(public_key)
-        decoded_signature = base64url_decode(
-            jwt_credentials.signature.encode())
-
-        return key.verify(jwt_credentials.message.encode(), decoded_signature)
+            await client.get_user(AccessToken=jwt_token)
+            allowed = True
+        except client.exceptions.NotAuthorizedException as e:
+            print(f"Error in get_user: {e.__str__()}")
+            allowed = False
+        revocation_check_cache.set(jwt_token, allowed)
+        return allowed
 
     async def __call__(self, request: Request) -> Optional[JWTAuthorizationCredentials]:
         credentials: HTTPAuthorizationCredentials = await super().__call__(request)
@@ -40,6 +40,13 @@ class JWTBearer(HTTPBearer):
                     status_code=HTTP_403_FORBIDDEN, detail="Wrong authentication method"
                 )
 
+            # The signature was already verified by AuthContextMiddleware
+            # against the cached JWKS keys
+            auth_context = await get_auth_context(request)
+            if not auth_context.is_authenticated:
+                raise HTTPException(
+                    status_code=HTTP_403_FORBIDDEN, detail="JWK invalid")
+
             jwt_token = credentials.credentials
             message, signature = jwt_token.rsplit(".", 1)
 
@@ -47,30 +54,16 @@ class JWTBearer(HTTPBearer):
                 jwt_credentials = JWTAuthorizationCredentials(
                     jwt_token=jwt_token,
                     header=jwt.get_unverified_header(jwt_token),
-                    claims=jwt.get_unverified_claims(jwt_token),
+                    claims=auth_context.claims,
                     signature=signature,
                     message=message,
                 )
-
-                try:
-                    # validate if the user is still allowed to login.
-                    # If disabled or deleted from cognito tokens are still valid
-                    # for some time.
-                    response = self.cognito.get_user(
-                        AccessToken=jwt_token
-                    )
-                    print("response: ", response)
-                except self.cognito.exceptions.NotAuthorizedException as e:
-                    print(f"Error in get_user: {e.__str__()}")
-                    raise HTTPException(
-                        status_code=HTTP_403_FORBIDDEN, detail="Access Token has expired")
-
             except JWTError:
                 raise HTTPException(
                     status_code=HTTP_403_FORBIDDEN, detail="JWK invalid")
 
-            if not self.verify_jwk_token(jwt_credentials):
+            if not await self.is_token_allowed(jwt_token):
                 raise HTTPException(
-                    status_code=HTTP_403_FORBIDDEN, detail="JWK invalid")
+                    status_code=HTTP_403_FORBIDDEN, detail="Access Token has expired")
 
-            return jwt_credentials
\ No newline at end of file
+            return jwt_credentials
@@ -0,0 +1,69 @@
+import asyncio
+from contextlib import AsyncExitStack
+from aiobotocore.client import AioBaseClient
+from aiobotocore.config import AioConfig
+from aiobotocore.session import get_session
+from app.core.config import settings
+
+
+class CognitoClient:
+    """
+    Owns the single aiobotocore cognito-idp client of a worker, so its
+    connection pool and TLS sessions are reused by every request.
+
+    It is opened in the app lifespan and closed on shutdown; `get_client`
+    opens it lazily when used outside the app (scripts, shells).
+    """
+
+    def __init__(self, max_pool_connections: int = 128):
+        self.max_pool_connections = max_pool_connections
+        self._client: AioBaseClient | None = None
+        self._exit_stack: AsyncExitStack | None = None
+        self._lock = asyncio.Lock()
+
+    async def start(self) -> None:
+        async with self._lock:
+            if self._client is not None:
+                return
+            exit_stack = AsyncExitStack()
+            self._client = await exit_stack.enter_async_context(
+                get_session().create_client(
+                    "cognito-idp",
+                    region_name=settings.COGNITO_REGION,
+                    aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+                    aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+                    config=AioConfig(max_pool_connections=self.max_pool_connections),
+                )
+            )
+            self._exit_stack = exit_stack
+
+    async def get_client(self) -> AioBaseClient:
+        if self._client is None:
+            await self.start()
+        return self._client
+
+    async def close(self) -> None:
+        async with self._lock:
+            if self._exit_stack is not None:
+                await self._exit_stack.aclose()
+            self._client = None
+            self._exit_stack = None
+
+    def pool_stats(self) -> dict[str, int | bool]:
+        if self._client is None:
+            return {"started": False}
+        http_session = getattr(self._client._endpoint, "http_session", None)
+        connector = getattr(http_session, "_connector", None)
+        if connector is None:
+            return {"started": True, "limit": self.max_pool_connections}
+        return {
+            "started": True,
+            "limit": connector.limit,
+            "in_use": len(connector._acquired),
+            "idle": sum(len(conns) for conns in connector._conns.values()),
+        }
+
+
+cognito_client = CognitoClient(
+    max_pool_connections=settings.COGNITO_MAX_POOL_CONNECTIONS
+)
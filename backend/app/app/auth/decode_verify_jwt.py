@@ -9,11 +9,11 @@
 # BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 # License for the specific language governing permissions and limitations under the License.
 
-import json
 import time
-import urllib.request
-from jose import jwk, jwt
+from jose import jwt
 from jose.utils import base64url_decode
+from app.auth.jwks import jwks_store
+from app.auth.token_cache import verified_claims_cache
 from app.core.config import settings
 
 
@@ -21,29 +21,23 @@ from app.core.config import settings
 region = settings.COGNITO_REGION
 userpool_id = settings.COGNITO_POOL_ID
 app_client_id = settings.COGNITO_CLIENT_ID
-keys_url = f'https://cognito-idp.{settings.COGNITO_REGION}.amazonaws.com/{settings.COGNITO_POOL_ID}/.well-known/jwks.json'.format(region, userpool_id)
-# instead of re-downloading the public keys every time
-# we download them only on cold start
-# https://aws.amazon.com/blogs/compute/container-reuse-in-lambda/
-with urllib.request.urlopen(keys_url) as f:
-  response = f.read()
-keys = json.loads(response.decode('utf-8'))['keys']
+# instead of re-downloading and re-parsing the public keys every time
+# they are kept in jwks_store, indexed by kid and refreshed in the background
+# from the app lifespan
 
-def verify_cognito_token(token):
+async def verify_cognito_token(token):
+    # tokens verified before are served from the cache until they expire
+    cached_claims = verified_claims_cache.get(token)
+    if cached_claims is not None:
+        return cached_claims
     # get the kid from the headers prior to verification
     headers = jwt.get_unverified_headers(token)
     kid = headers['kid']
-    # search for the kid in the downloaded public keys
-    key_index = -1
-    for i in range(len(keys)):
-        if kid == keys[i]['kid']:
-            key_index = i
-            break
-    if key_index == -1:
+    # look up the already constructed public key for the kid
+    public_key = await jwks_store.get_key(kid)
+    if public_key is None:
         print('Public key not found in jwks.json')
         return False
-    # construct the public key
-    public_key = jwk.construct(keys[key_index])
     # get the last two sections of the token,
     # message and signature (encoded in base64)
     message, encoded_signature = str(token).rsplit('.', 1)
@@ -62,4 +56,5 @@ def verify_cognito_token(token):
     #if claims['client_id'] != app_client_id:
     #    return False
     # now we can use the claims
+    verified_claims_cache.set(token, claims)
     return claims
@@ -1,11 +1,96 @@
-import os
-import requests
+import asyncio
+import logging
+import time
+from contextlib import suppress
+import httpx
+from jose import jwk
+from jose.backends.base import Key
 from app.auth.auth_schema import JWKS
 from app.core.config import settings
 
 
-jwks = JWKS.parse_obj(
-    requests.get(
-        f"{settings.COGNITO_URL}/{settings.COGNITO_POOL_ID}/.well-known/jwks.json"
-    ).json()
+class JWKSKeyStore:
+    """
+    Keeps the Cognito public keys parsed and indexed by kid, so verifying a
+    token is a dict lookup instead of a download plus an RSA key construction.
+
+    Keys are refreshed in the background while the app is running and
+    refetched once, on demand, when a token arrives signed with an unknown kid
+    (Cognito key rotation).
+    """
+
+    def __init__(
+        self,
+        keys_url: str,
+        refresh_interval: int = 60 * 60,
+        min_refetch_interval: int = 30,
+    ):
+        self.keys_url = keys_url
+        self.refresh_interval = refresh_interval
+        self.min_refetch_interval = min_refetch_interval
+        self.jwks: JWKS = JWKS(keys=[])
+        self._keys: dict[str, Key] = {}
+        self._last_fetch: float | None = None
+        self._lock = asyncio.Lock()
+        self._refresh_task: asyncio.Task | None = None
+
+    def get(self, kid: str) -> Key | None:
+        return self._keys.get(kid)
+
+    async def get_key(self, kid: str) -> Key | None:
+        key = self._keys.get(kid)
+        if key is None:
+            # The kid may belong to a freshly rotated key, refetch a single time
+            try:
+                await self.refresh(force=False)
+            except Exception as e:
+                logging.error(f"Error refreshing jwks.json: {e}")
+            key = self._keys.get(kid)
+        return key
+
+    async def refresh(self, force: bool = True) -> None:
+        async with self._lock:
+            # Concurrent misses for the same unknown kid share one download
+            if (
+                not force
+                and self._last_fetch is not None
+                and time.monotonic() - self._last_fetch < self.min_refetch_interval
+            ):
+                return
+            async with httpx.AsyncClient(timeout=10) as client:
+                response = await client.get(self.keys_url)
+                response.raise_for_status()
+            jwks = JWKS.parse_obj(response.json())
+            self._keys = {key["kid"]: jwk.construct(key) for key in jwks.keys}
+            self.jwks = jwks
+            self._last_fetch = time.monotonic()
+
+    async def _refresh_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logging.error(f"Error refreshing jwks.json: {e}")
+
+    async def start(self) -> None:
+        try:
+            await self.refresh()
+        except Exception as e:
+            # Keys are fetched lazily on the first token if Cognito is unreachable
+            logging.error(f"Error downloading jwks.json: {e}")
+        self._refresh_task = asyncio.create_task(self._refresh_periodically())
+
+    async def stop(self) -> None:
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._refresh_task
+            self._refresh_task = None
+
+
+jwks_store = JWKSKeyStore(
+    keys_url=f"https://cognito-idp.{settings.COGNITO_REGION}.amazonaws.com/{settings.COGNITO_POOL_ID}/.well-known/jwks.json",
+    refresh_interval=settings.JWKS_REFRESH_INTERVAL,
+    min_refetch_interval=settings.JWKS_MIN_REFETCH_INTERVAL,
 )
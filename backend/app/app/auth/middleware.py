@@ -0,0 +1,65 @@
+import logging
+from dataclasses import dataclass
+from typing import Any
+from starlette.datastructures import Headers, QueryParams
+from starlette.requests import HTTPConnection
+from starlette.types import ASGIApp, Receive, Scope, Send
+from app.auth.decode_verify_jwt import verify_cognito_token
+
+AUTH_CONTEXT_KEY = "auth"
+
+
+@dataclass
+class AuthContext:
+    """Bearer token of a request and its claims when the token verified."""
+
+    token: str | None = None
+    claims: dict[str, Any] | None = None
+
+    @property
+    def is_authenticated(self) -> bool:
+        return self.claims is not None
+
+
+async def resolve_auth_context(scope: Scope) -> AuthContext:
+    token = None
+    scheme, _, credentials = Headers(scope=scope).get("Authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and credentials:
+        token = credentials.strip()
+    elif scope["type"] == "websocket":
+        # Browsers can not set headers on the websocket handshake
+        token = QueryParams(scope.get("query_string", b"")).get("token")
+
+    claims = None
+    if token:
+        try:
+            claims = await verify_cognito_token(token) or None
+        except Exception as e:
+            logging.info(f"Invalid bearer token: {e}")
+    return AuthContext(token=token, claims=claims)
+
+
+class AuthContextMiddleware:
+    """
+    Pure ASGI middleware that verifies the bearer token of every http and
+    websocket request once and stores the result in `request.state.auth`.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] in ("http", "websocket"):
+            state = scope.setdefault("state", {})
+            state[AUTH_CONTEXT_KEY] = await resolve_auth_context(scope)
+        await self.app(scope, receive, send)
+
+
+async def get_auth_context(connection: HTTPConnection) -> AuthContext:
+    state = connection.scope.setdefault("state", {})
+    auth_context = state.get(AUTH_CONTEXT_KEY)
+    if auth_context is None:
+        # Resolve it here if the middleware is not installed (e.g. sub apps)
+        auth_context = await resolve_auth_context(connection.scope)
+        state[AUTH_CONTEXT_KEY] = auth_context
+    return auth_context
@@ -0,0 +1,147 @@
+import json
+import logging
+import time
+from collections import OrderedDict
+from redis.asyncio import Redis
+from sqlalchemy.orm import make_transient_to_detached
+from app.core.config import settings
+from app.models.user_model import User
+from app.schemas.common_schema import IDecodedToken
+
+
+class PrincipalCache:
+    """
+    Two-tier cache from a token subject (Cognito `sub`) to its resolved
+    principal: the `User` row used by `get_current_user` and the
+    `IDecodedToken` used by `get_user_id`.
+
+    The local tier is a short TTL LRU per worker, the Redis tier is shared by
+    all workers. Entries are indexed by email so `crud.user` can drop every
+    principal of a user when it changes; local entries of other workers expire
+    after `local_ttl` seconds.
+    """
+
+    def __init__(
+        self,
+        local_ttl: int = 10,
+        redis_ttl: int = 300,
+        max_size: int = 10_000,
+        prefix: str = "principal",
+    ):
+        self.local_ttl = local_ttl
+        self.redis_ttl = redis_ttl
+        self.max_size = max_size
+        self.prefix = prefix
+        self.redis: Redis | None = None
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self._local: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._keys_by_email: dict[str, set[str]] = {}
+
+    def _key(self, kind: str, sub: str) -> str:
+        return f"{self.prefix}:{kind}:{sub}"
+
+    def _email_key(self, email: str) -> str:
+        return f"{self.prefix}:email:{email.lower()}"
+
+    async def _get(self, key: str) -> str | None:
+        entry = self._local.get(key)
+        if entry is not None:
+            expires_at, raw = entry
+            if time.monotonic() < expires_at:
+                self._local.move_to_end(key)
+                self.local_hits += 1
+                return raw
+            del self._local[key]
+        raw = None
+        if self.redis is not None:
+            try:
+                raw = await self.redis.get(key)
+            except Exception as e:
+                logging.error(f"Error reading principal cache: {e}")
+        if raw is None:
+            self.misses += 1
+            return None
+        self.redis_hits += 1
+        self._set_local(key, raw)
+        return raw
+
+    def _set_local(self, key: str, raw: str) -> None:
+        self._local[key] = (time.monotonic() + self.local_ttl, raw)
+        self._local.move_to_end(key)
+        while len(self._local) > self.max_size:
+            self._local.popitem(last=False)
+
+    async def _set(self, key: str, raw: str, email: str) -> None:
+        self._set_local(key, raw)
+        self._keys_by_email.setdefault(email.lower(), set()).add(key)
+        if self.redis is None:
+            return
+        email_key = self._email_key(email)
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.set(key, raw, ex=self.redis_ttl)
+                pipe.sadd(email_key, key)
+                pipe.expire(email_key, self.redis_ttl)
+                await pipe.execute()
+        except Exception as e:
+            logging.error(f"Error writing principal cache: {e}")
+
+    async def get_user(self, sub: str) -> User | None:
+        raw = await self._get(self._key("user", sub))
+        if raw is None:
+            return None
+        user = User.validate(json.loads(raw))
+        # Let the session UPDATE (not INSERT) the row if the user is modified
+        make_transient_to_detached(user)
+        return user
+
+    async def set_user(self, sub: str, user: User) -> None:
+        await self._set(self._key("user", sub), user.json(), user.email)
+
+    async def get_decoded_token(self, sub: str) -> IDecodedToken | None:
+        raw = await self._get(self._key("decoded_token", sub))
+        if raw is None:
+            return None
+        return IDecodedToken.parse_raw(raw)
+
+    async def set_decoded_token(self, sub: str, decoded_token: IDecodedToken) -> None:
+        await self._set(
+            self._key("decoded_token", sub), decoded_token.json(), decoded_token.email
+        )
+
+    async def invalidate(self, *emails: str) -> None:
+        keys: set[str] = set()
+        for email in {email.lower() for email in emails if email}:
+            keys |= self._keys_by_email.pop(email, set())
+            if self.redis is None:
+                continue
+            email_key = self._email_key(email)
+            try:
+                keys |= await self.redis.smembers(email_key)
+                await self.redis.delete(email_key, *keys)
+            except Exception as e:
+                logging.error(f"Error invalidating principal cache: {e}")
+        for key in keys:
+            self._local.pop(key, None)
+
+    def cache_info(self) -> dict[str, int | float]:
+        lookups = self.local_hits + self.redis_hits + self.misses
+        return {
+            "local_hits": self.local_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "hit_ratio": (self.local_hits + self.redis_hits) / lookups
+            if lookups
+            else 0.0,
+            "local_size": len(self._local),
+            "max_size": self.max_size,
+        }
+
+
+principal_cache = PrincipalCache(
+    local_ttl=settings.PRINCIPAL_CACHE_LOCAL_TTL,
+    redis_ttl=settings.PRINCIPAL_CACHE_REDIS_TTL,
+    max_size=settings.PRINCIPAL_CACHE_MAX_SIZE,
+)
@@ -0,0 +1,113 @@
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any
+from app.core.config import settings
+
+
+class VerifiedClaimsCache:
+    """
+    Bounded LRU of the claims of tokens whose signature was already verified.
+
+    Entries are keyed by a sha256 of the token, so raw tokens are never kept in
+    memory, and live until the token's `exp`.
+    """
+
+    def __init__(self, max_size: int = 10_000):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._claims: OrderedDict[bytes, dict[str, Any]] = OrderedDict()
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode("utf-8")).digest()
+
+    def get(self, token: str) -> dict[str, Any] | None:
+        key = self._key(token)
+        claims = self._claims.get(key)
+        if claims is None:
+            self.misses += 1
+            return None
+        if time.time() > claims["exp"]:
+            del self._claims[key]
+            self.misses += 1
+            return None
+        self._claims.move_to_end(key)
+        self.hits += 1
+        return dict(claims)
+
+    def set(self, token: str, claims: dict[str, Any]) -> None:
+        key = self._key(token)
+        self._claims[key] = dict(claims)
+        self._claims.move_to_end(key)
+        while len(self._claims) > self.max_size:
+            self._claims.popitem(last=False)
+
+    def clear(self) -> None:
+        self._claims.clear()
+
+    def cache_info(self) -> dict[str, int | float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "size": len(self._claims),
+            "max_size": self.max_size,
+        }
+
+
+class RevocationCheckCache:
+    """
+    Remembers the last answer of Cognito to "is this access token still
+    allowed", so the check runs at most once per `staleness_window` seconds
+    per token. Revoked tokens stay revoked until they are evicted.
+    """
+
+    def __init__(self, staleness_window: int = 60, max_size: int = 10_000):
+        self.staleness_window = staleness_window
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._checks: OrderedDict[bytes, tuple[float, bool]] = OrderedDict()
+
+    def get(self, token: str) -> bool | None:
+        key = hashlib.sha256(token.encode("utf-8")).digest()
+        entry = self._checks.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        checked_at, allowed = entry
+        if allowed and time.monotonic() - checked_at > self.staleness_window:
+            del self._checks[key]
+            self.misses += 1
+            return None
+        self._checks.move_to_end(key)
+        self.hits += 1
+        return allowed
+
+    def set(self, token: str, allowed: bool) -> None:
+        key = hashlib.sha256(token.encode("utf-8")).digest()
+        self._checks[key] = (time.monotonic(), allowed)
+        self._checks.move_to_end(key)
+        while len(self._checks) > self.max_size:
+            self._checks.popitem(last=False)
+
+    def cache_info(self) -> dict[str, int | float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "size": len(self._checks),
+            "max_size": self.max_size,
+            "staleness_window": self.staleness_window,
+        }
+
+
+verified_claims_cache = VerifiedClaimsCache(max_size=settings.TOKEN_CACHE_MAX_SIZE)
+revocation_check_cache = RevocationCheckCache(
+    staleness_window=settings.COGNITO_REVOCATION_CHECK_INTERVAL,
+    max_size=settings.TOKEN_CACHE_MAX_SIZE,
+)
@@ -1,7 +1,8 @@
 import os
 from pydantic import BaseSettings, PostgresDsn, validator, EmailStr, AnyHttpUrl
-from typing import Any
+from typing import Any, Literal
 import secrets
+from app.db.collection_profiles import get_collection_profile
 
 
 class Settings(BaseSettings):
@@ -18,9 +19,29 @@ class Settings(BaseSettings):
     DATABASE_CELERY_NAME: str = "celery_schedule_jobs"
     REDIS_HOST: str
     REDIS_PORT: str
+    REDIS_MAX_CONNECTIONS: int = 128
+    RATE_LIMIT_SYNC_INTERVAL: float = 1.0  # seconds between batched syncs
+    RATE_LIMIT_BATCH_SIZE: int = 20  # local hits per key before a sync
+    RATE_LIMIT_OVERSHOOT: int = 10  # hits all workers may exceed a limit by
     QDRANT_HOST: str
     QDRANT_CLOUD_URL: AnyHttpUrl
     QDRANT_CLOUD_API_KEY: str
+    QDRANT_MAX_CONNECTIONS: int = 32
+    QDRANT_PREFER_GRPC: bool = False
+    QDRANT_COLLECTION_PROFILE: str = "full"  # see app/db/collection_profiles.py
+
+    @validator("QDRANT_COLLECTION_PROFILE")
+    def check_collection_profile(cls, v: str) -> str:
+        # Fail at startup instead of init_db leaving no collection behind
+        get_collection_profile(v)
+        return v
+
+    VECTOR_SEARCH_BACKEND: Literal["qdrant", "local"] = "qdrant"
+    VECTOR_INDEX_DIR: str = "app/data/vector_index"
+    VECTOR_INDEX_RELOAD_INTERVAL: float = 5.0  # seconds between snapshot checks
+    CHAT_RETRIEVER_MODE: Literal["similarity", "mmr"] = "similarity"
+    CHAT_RETRIEVER_FETCH_K: int = 20  # candidates re-ranked by MMR
+    CHAT_RETRIEVER_DUPLICATE_THRESHOLD: float = 0.95  # cosine similarity
     SUPERTOKENS_CORE_URI: str
     SUPERTOKENS_CORE_API_KEY: str
     COGNITO_URL: str
@@ -30,6 +51,22 @@ class Settings(BaseSettings):
     COGNITO_REGION: str
     AWS_SECRET_ACCESS_KEY: str
     AWS_ACCESS_KEY_ID: str
+    COGNITO_MAX_POOL_CONNECTIONS: int = 128
+    JWKS_REFRESH_INTERVAL: int = 60 * 60  # 1 hour
+    JWKS_MIN_REFETCH_INTERVAL: int = 30  # seconds between refetches on unknown kid
+    TOKEN_CACHE_MAX_SIZE: int = 10_000
+    COGNITO_REVOCATION_CHECK_INTERVAL: int = 60  # seconds a get_user check is trusted
+    PRINCIPAL_CACHE_LOCAL_TTL: int = 10  # seconds
+    PRINCIPAL_CACHE_REDIS_TTL: int = 60 * 5  # 5 minutes
+    PRINCIPAL_CACHE_MAX_SIZE: int = 10_000
+    EMBEDDING_CACHE_MAX_SIZE: int = 5_000  # ~6 KB per ada-002 vector
+    EMBEDDING_CACHE_REDIS_TTL: int = 60 * 60 * 24 * 7  # 1 week
+    SEARCH_CACHE_TTL: int = 60 * 60  # 1 hour
+    EMBEDDING_BATCH_MAX_DELAY_MS: float = 5
+    EMBEDDING_BATCH_MAX_SIZE: int = 512  # distinct texts per OpenAI call
+    EMBEDDING_BATCH_MAX_TOKENS: int = 50_000
+    EMBEDDING_BATCH_MAX_CONCURRENCY: int = 8  # OpenAI calls in flight
+    EMBEDDINGS_CHUNK_MAX_TOKENS: int = 8_000  # per call of /openai/embeddings
     DB_POOL_SIZE = 83
     WEB_CONCURRENCY = 9
     POOL_SIZE = max(DB_POOL_SIZE // WEB_CONCURRENCY, 5)
@@ -106,6 +143,8 @@ class Settings(BaseSettings):
 
     SECRET_KEY: str = secrets.token_urlsafe(32)
     ENCRYPT_KEY = secrets.token_urlsafe(32)
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_CONCURRENCY: int = 8
     BACKEND_CORS_ORIGINS: list[str] | list[AnyHttpUrl]
 
     @validator("BACKEND_CORS_ORIGINS", pre=True)
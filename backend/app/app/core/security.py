@@ -1,5 +1,10 @@
+import asyncio
+import logging
+import multiprocessing
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
-from typing import Any
+from typing import Any, TypeVar
 from cryptography.fernet import Fernet
 from jose import jwt
 from passlib.context import CryptContext
@@ -10,6 +15,89 @@ fernet = Fernet(str.encode(settings.ENCRYPT_KEY))
 
 ALGORITHM = "HS256"
 
+T = TypeVar("T")
+
+
+class PasswordHashPool:
+    """
+    Runs bcrypt in a bounded process pool so a hash (100-300 ms of CPU) never
+    stalls the event loop. At most `max_concurrency` calls are handed to the
+    pool at once, the rest wait in line and are counted in `waiting`.
+
+    Workers are spawned, not forked, since forking a threaded worker with
+    grpc, aiobotocore and redis loaded can deadlock the children. `start` is
+    called in the app lifespan so the first login does not pay for it.
+    """
+
+    def __init__(self, max_workers: int = 2, max_concurrency: int = 8):
+        self.max_workers = max_workers
+        self.max_concurrency = max_concurrency
+        self.waiting = 0
+        self.max_waiting = 0
+        self.in_flight = 0
+        self.completed = 0
+        self._executor: ProcessPoolExecutor | None = None
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    async def start(self) -> None:
+        # Concurrent calls make the pool spawn every worker and load bcrypt now
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        try:
+            await asyncio.gather(
+                *(
+                    loop.run_in_executor(executor, load_hash_backend)
+                    for _ in range(self.max_workers)
+                )
+            )
+        except Exception as e:
+            logging.error(f"Error starting the password hash pool: {e}")
+
+    async def run(self, func: Callable[..., T], *args: Any) -> T:
+        self.waiting += 1
+        self.max_waiting = max(self.max_waiting, self.waiting)
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+            self._semaphore.release()
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "max_workers": self.max_workers,
+            "max_concurrency": self.max_concurrency,
+            "waiting": self.waiting,
+            "max_waiting": self.max_waiting,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+        }
+
+
+password_hash_pool = PasswordHashPool(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_concurrency=settings.PASSWORD_HASH_MAX_CONCURRENCY,
+)
+
 
 def create_access_token(subject: str | Any, expires_delta: timedelta = None) -> str:
     if expires_delta:
@@ -35,6 +123,10 @@ def create_refresh_token(subject: str | Any, expires_delta: timedelta = None) ->
     return encoded_jwt
 
 
+def load_hash_backend() -> None:
+    pwd_context.handler("bcrypt").get_backend()
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
@@ -43,6 +135,14 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+async def averify_password(plain_password: str, hashed_password: str) -> bool:
+    return await password_hash_pool.run(verify_password, plain_password, hashed_password)
+
+
+async def aget_password_hash(password: str) -> str:
+    return await password_hash_pool.run(get_password_hash, password)
+
+
 def get_data_encrypt(data) -> str:
     data = fernet.encrypt(data)
     return data.decode()
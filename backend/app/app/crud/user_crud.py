@@ -1,7 +1,10 @@
 from uuid import UUID
 from app.schemas.user_schema import IUserCreate, IUserUpdate
 from app.models.user_model import User
-from app.core.security import verify_password, get_password_hash
+from app.auth.principal_cache import principal_cache
+from app.core.security import averify_password, aget_password_hash
+from app.db.redis import redis_pool
+from app.utils.token import delete_tokens_for_users
 from pydantic.networks import EmailStr
 from typing import Any
 from app.crud.base_crud import CRUDBase
@@ -33,30 +36,50 @@ class CRUDUser(CRUDBase[User, IUserCreate, IUserUpdate]):
     ) -> User:
         db_session = db_session or super().get_db().session
         db_obj = User.from_orm(obj_in)
-        db_obj.hashed_password = get_password_hash(obj_in.password)
+        db_obj.hashed_password = await aget_password_hash(obj_in.password)
         db_session.add(db_obj)
         await db_session.commit()
         await db_session.refresh(db_obj)
         return db_obj
 
+    async def update(
+        self,
+        *,
+        obj_current: User,
+        obj_new: IUserUpdate | dict[str, Any] | User,
+        db_session: AsyncSession | None = None,
+    ) -> User:
+        previous_email = obj_current.email
+        user = await super().update(
+            obj_current=obj_current, obj_new=obj_new, db_session=db_session
+        )
+        await principal_cache.invalidate(previous_email, user.email)
+        return user
+
     async def update_is_active(
         self, *, db_obj: list[User], obj_in: int | str | dict[str, Any]
     ) -> User | None:
-        response = None
+        response = []
         db_session = super().get_db().session
         for x in db_obj:
             x.is_active = obj_in.is_active
             db_session.add(x)
             await db_session.commit()
             await db_session.refresh(x)
+            await principal_cache.invalidate(x.email)
             response.append(x)
+        if not obj_in.is_active:
+            # Revoke the access and refresh tokens of every user in one DEL
+            await delete_tokens_for_users(
+                redis_pool.get_client(), [x.id for x in response]
+            )
         return response
 
     async def authenticate(self, *, email: EmailStr, password: str) -> User | None:
         user = await self.get_by_email(email=email)
         if not user:
             return None
-        if not verify_password(password, user.hashed_password):
+        if not await averify_password(password, user.hashed_password):
             return None
         return user
 
@@ -0,0 +1,148 @@
+from dataclasses import dataclass
+from typing import Any, Literal
+from qdrant_client.http import models
+
+
+@dataclass(frozen=True)
+class CollectionProfile:
+    """
+    How a collection stores its vectors, from full precision in RAM to
+    quantized vectors in RAM with the originals on disk.
+    """
+
+    name: str
+    quantization: Literal["none", "scalar", "product"] = "none"
+    # Keep the quantized vectors in RAM even when the originals are on disk
+    quantized_always_ram: bool = True
+    # Re-rank the quantized candidates with the original vectors
+    rescore: bool | None = None
+    product_compression: str = "x16"
+    on_disk_vectors: bool = False
+    on_disk_payload: bool = False
+    hnsw_m: int | None = None
+    hnsw_ef_construct: int | None = None
+    # Segments larger than this (in KB) are memory-mapped instead of in RAM
+    memmap_threshold: int = 20_000
+
+    @property
+    def supported(self) -> bool:
+        # The pinned qdrant-client 1.1.5 has no product quantization models
+        return self.quantization != "product" or hasattr(
+            models, "ProductQuantization"
+        )
+
+    def quantization_config(self) -> Any:
+        if self.quantization == "scalar":
+            return models.ScalarQuantization(
+                scalar=models.ScalarQuantizationConfig(
+                    type=models.ScalarType.INT8,
+                    quantile=0.99,
+                    always_ram=self.quantized_always_ram,
+                )
+            )
+        if self.quantization == "product":
+            if not self.supported:
+                raise ValueError(
+                    "Product quantization needs Qdrant and qdrant-client >= 1.2"
+                )
+            return models.ProductQuantization(
+                product=models.ProductQuantizationConfig(
+                    compression=models.CompressionRatio(self.product_compression),
+                    always_ram=self.quantized_always_ram,
+                )
+            )
+        return None
+
+    def recreate_collection_kwargs(
+        self, size: int, distance: models.Distance = models.Distance.COSINE
+    ) -> dict[str, Any]:
+        """
+        Keyword arguments of `QdrantClient.recreate_collection` for this profile.
+        """
+        vector_params: dict[str, Any] = {"size": size, "distance": distance}
+        if self.on_disk_vectors and "on_disk" in models.VectorParams.__fields__:
+            vector_params["on_disk"] = True
+        kwargs: dict[str, Any] = {
+            "vectors_config": models.VectorParams(**vector_params),
+            "on_disk_payload": self.on_disk_payload,
+        }
+        if self.on_disk_vectors:
+            # Releases without VectorParams.on_disk keep originals on disk
+            # through memory-mapped segments
+            kwargs["optimizers_config"] = models.OptimizersConfigDiff(
+                memmap_threshold=self.memmap_threshold
+            )
+        if self.hnsw_m is not None or self.hnsw_ef_construct is not None:
+            kwargs["hnsw_config"] = models.HnswConfigDiff(
+                m=self.hnsw_m, ef_construct=self.hnsw_ef_construct
+            )
+        quantization_config = self.quantization_config()
+        if quantization_config is not None:
+            kwargs["quantization_config"] = quantization_config
+        return kwargs
+
+    def estimated_ram_bytes(self, points: int, size: int) -> int:
+        """
+        Rough resident size of the vectors plus the HNSW graph, payloads and
+        memory-mapped pages evicted under pressure are not counted.
+        """
+        original = 0 if self.on_disk_vectors else points * size * 4
+        quantized = 0
+        if self.quantization == "scalar":
+            quantized = points * size
+        elif self.quantization == "product":
+            ratio = int(self.product_compression.lstrip("x"))
+            quantized = points * size * 4 // ratio
+        if not self.quantized_always_ram and self.on_disk_vectors:
+            quantized = 0
+        # Level 0 links 2 * m neighbours per point, 4 bytes each
+        graph = points * 2 * (self.hnsw_m or 16) * 4
+        return original + quantized + graph
+
+
+COLLECTION_PROFILES = {
+    profile.name: profile
+    for profile in (
+        # The original setup, full precision vectors and payloads in RAM
+        CollectionProfile(name="full"),
+        CollectionProfile(
+            name="on_disk",
+            on_disk_vectors=True,
+            on_disk_payload=True,
+        ),
+        # ~4x less RAM, int8 vectors in RAM re-ranked with the originals
+        CollectionProfile(
+            name="scalar",
+            quantization="scalar",
+            rescore=True,
+            on_disk_vectors=True,
+            on_disk_payload=True,
+            hnsw_m=16,
+            hnsw_ef_construct=100,
+        ),
+        # ~16x+ less RAM, lower recall before rescoring
+        CollectionProfile(
+            name="product",
+            quantization="product",
+            rescore=True,
+            on_disk_vectors=True,
+            on_disk_payload=True,
+            hnsw_m=16,
+            hnsw_ef_construct=100,
+        ),
+    )
+}
+
+
+def get_collection_profile(name: str) -> CollectionProfile:
+    try:
+        profile = COLLECTION_PROFILES[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown collection profile {name}, use one of {list(COLLECTION_PROFILES)}"
+        )
+    if not profile.supported:
+        raise ValueError(
+            f"Collection profile {name} needs Qdrant and qdrant-client >= 1.2"
+        )
+    return profile
@@ -1,18 +1,70 @@
+import os
 import openai
 from sqlmodel.ext.asyncio.session import AsyncSession
 from app.core.config import settings
+from app.db.collection_profiles import get_collection_profile
 from app.schemas.user_schema import IUserCreate
-from qdrant_client.models import Distance, VectorParams
+from app.utils.search_cache import search_cache
+from app.utils.lexical_index import BM25Index
+from app.utils.vector_index import LocalVectorIndex
+from qdrant_client.models import Distance
 from qdrant_client import QdrantClient, models
 import pandas as pd
 
 openai.api_key = settings.OPENAI_API_KEY
 
+PAYLOAD_INDEXES = {
+    "product_id": models.PayloadSchemaType.KEYWORD,
+    "user_id": models.PayloadSchemaType.KEYWORD,
+    "score": models.PayloadSchemaType.INTEGER,
+    "n_tokens": models.PayloadSchemaType.INTEGER,
+}
+
 
 async def init_db(db_session: AsyncSession) -> None:
     input_datapath = "app/data/fine_food_reviews_with_embeddings_1k.csv"  # to save space, we provide a pre-filtered dataset
     df = pd.read_csv(input_datapath, index_col=0)
 
+    records = []
+    for idx, row in df.iterrows():
+        vector = [float(i) for i in row["embedding"].strip("[]").split(",")]
+        records.append(
+            models.Record(
+                id=int(idx),
+                vector=vector,
+                payload={
+                    "product_id": row["ProductId"],
+                    "user_id": row["UserId"],
+                    "score": int(row["Score"]),
+                    "summary": row["Summary"],
+                    "page_content": row["Text"],
+                    "metadata": None,
+                    "n_tokens": int(row["n_tokens"]),
+                },
+            )
+        )
+
+    index_path = os.path.join(settings.VECTOR_INDEX_DIR, "my_docs")
+    try:
+        # In process search backend (VECTOR_SEARCH_BACKEND=local)
+        LocalVectorIndex.save(
+            index_path,
+            ids=[record.id for record in records],
+            vectors=[record.vector for record in records],
+            payloads=[record.payload for record in records],
+        )
+    except Exception as e:
+        print(e)
+
+    try:
+        # Lexical and hybrid search modes
+        BM25Index.build(
+            ids=[record.id for record in records],
+            texts=[record.payload["page_content"] for record in records],
+        ).save(index_path)
+    except Exception as e:
+        print(e)
+
     is_cloud_qdrant = True
     qdrant_client = (
         QdrantClient(
@@ -23,28 +75,17 @@ async def init_db(db_session: AsyncSession) -> None:
     )
 
     try:
+        profile = get_collection_profile(settings.QDRANT_COLLECTION_PROFILE)
         qdrant_client.recreate_collection(
             collection_name="my_docs",
-            vectors_config=VectorParams(size=1536, distance=Distance.COSINE),
+            **profile.recreate_collection_kwargs(size=1536, distance=Distance.COSINE),
         )
-
-        records = []
-        for idx, row in df.iterrows():
-            vector = [float(i) for i in row["embedding"].strip("[]").split(",")]
-            records.append(
-                models.Record(
-                    id=idx,
-                    vector=vector,
-                    payload={
-                        "product_id": row["ProductId"],
-                        "user_id": row["UserId"],
-                        "score": row["Score"],
-                        "summary": row["Summary"],
-                        "page_content": row["Text"],
-                        "metadata": None,
-                        "n_tokens": row["n_tokens"],
-                    },
-                )
+        # Filtered searches use these indexes instead of scanning payloads
+        for field_name, field_schema in PAYLOAD_INDEXES.items():
+            qdrant_client.create_payload_index(
+                collection_name="my_docs",
+                field_name=field_name,
+                field_schema=field_schema,
             )
 
         qdrant_client.upload_records(
@@ -54,3 +95,9 @@ async def init_db(db_session: AsyncSession) -> None:
 
     except Exception as e:
         print(e)
+
+    try:
+        # The collection was recreated, cached search results are stale
+        await search_cache.bump_version("my_docs")
+    except Exception as e:
+        print(e)
@@ -0,0 +1,80 @@
+import redis
+import redis.asyncio as aioredis
+from redis.asyncio import Redis
+from app.core.config import settings
+
+
+class RedisPool:
+    """
+    Owns the app wide redis.asyncio client, so every dependency, websocket
+    and cache shares one connection pool per worker. It is closed in the app
+    lifespan.
+
+    Binary values (e.g. packed embeddings) go through a second client that
+    does not decode responses, with a sync variant for code that cannot await.
+    """
+
+    def __init__(self, url: str, max_connections: int = 128):
+        self.url = url
+        self.max_connections = max_connections
+        self._client: Redis | None = None
+        self._binary_client: Redis | None = None
+        self._sync_binary_client: redis.Redis | None = None
+
+    def get_client(self) -> Redis:
+        if self._client is None:
+            self._client = aioredis.from_url(
+                self.url,
+                max_connections=self.max_connections,
+                encoding="utf8",
+                decode_responses=True,
+            )
+        return self._client
+
+    def get_binary_client(self) -> Redis:
+        if self._binary_client is None:
+            self._binary_client = aioredis.from_url(
+                self.url, max_connections=self.max_connections
+            )
+        return self._binary_client
+
+    def get_sync_binary_client(self) -> redis.Redis:
+        if self._sync_binary_client is None:
+            # Used from the event loop by sync callbacks, keep the wait short
+            self._sync_binary_client = redis.Redis.from_url(
+                self.url,
+                max_connections=self.max_connections,
+                socket_timeout=1,
+                socket_connect_timeout=1,
+            )
+        return self._sync_binary_client
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.close(close_connection_pool=True)
+            self._client = None
+        if self._binary_client is not None:
+            await self._binary_client.close(close_connection_pool=True)
+            self._binary_client = None
+        if self._sync_binary_client is not None:
+            self._sync_binary_client.close()
+            self._sync_binary_client.connection_pool.disconnect()
+            self._sync_binary_client = None
+
+    def pool_stats(self) -> dict[str, int | bool]:
+        if self._client is None:
+            return {"started": False}
+        pool = self._client.connection_pool
+        return {
+            "started": True,
+            "max_connections": pool.max_connections,
+            "created": pool._created_connections,
+            "in_use": len(pool._in_use_connections),
+            "idle": len(pool._available_connections),
+        }
+
+
+redis_pool = RedisPool(
+    url=f"redis://{settings.REDIS_HOST}:{settings.REDIS_PORT}",
+    max_connections=settings.REDIS_MAX_CONNECTIONS,
+)
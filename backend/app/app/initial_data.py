@@ -1,11 +1,13 @@
 import asyncio
 from app.db.init_db import init_db
+from app.db.redis import redis_pool
 from app.db.session import SessionLocal
 
 
 async def create_init_data() -> None:
     async with SessionLocal() as session:
         await init_db(session)
+    await redis_pool.close()
 
 
 async def main() -> None:
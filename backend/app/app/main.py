@@ -1,11 +1,19 @@
 import logging
 from uuid import UUID, uuid4
-from app.api.deps import get_redis_client, get_sync_qdrant_client
+from app.api.deps import (
+    get_langchain_embeddings,
+    get_redis_client,
+    neural_searchers,
+    resolve_user,
+)
 from app.schemas.common_schema import IChatResponse, IUserMessage
-from app import crud
 from app.utils.callback import QuestionGenCallbackHandler, StreamingLLMCallbackHandler
+from app.utils.mmr_retriever import MMRRetriever, SimilarityRetriever
 from app.utils.query_data import get_chain, get_chat_chain
-from app.auth.decode_verify_jwt import verify_cognito_token
+from app.auth.cognito import cognito_client
+from app.auth.jwks import jwks_store
+from app.auth.middleware import AuthContextMiddleware, get_auth_context
+from app.auth.principal_cache import principal_cache
 from app.utils.uuid6 import uuid7
 from fastapi import (
     Depends,
@@ -13,6 +21,7 @@ from fastapi import (
     Request,
     WebSocket,
     WebSocketDisconnect,
+    status,
 )
 from fastapi_pagination import add_pagination
 from starlette.middleware.cors import CORSMiddleware
@@ -21,29 +30,25 @@ from fastapi_async_sqlalchemy import SQLAlchemyMiddleware, db
 from contextlib import asynccontextmanager
 from app.utils.fastapi_globals import GlobalsMiddleware
 from app.core.config import settings
+from app.core.security import password_hash_pool
+from app.utils.embedding_batcher import embedding_batcher
+from app.db.redis import redis_pool
 from fastapi_limiter import FastAPILimiter
-from fastapi_limiter.depends import RateLimiter
 from langchain.vectorstores import Qdrant
-from langchain.embeddings.openai import OpenAIEmbeddings
-from fastapi_limiter.depends import RateLimiter, WebSocketRateLimiter
+from redis.asyncio import Redis
+from app.utils.rate_limiter import HybridWebSocketRateLimiter, rate_limit_store
 from app.models.user_model import User
 from app.utils.exceptions.common_exception import IdNotFoundException
 
 
 async def user_id_identifier(request: Request):
     if request.scope["type"] == "http":
-        # Retrieve the Authorization header from the request
-        auth_header = request.headers.get("Authorization")
-
-        if auth_header != None:
-            # Check that the header is in the correct format
-            header_parts = auth_header.split()
-            if len(header_parts) == 2 and header_parts[0].lower() == "bearer":
-                token = header_parts[1]
-                decoded_token = verify_cognito_token(token)        
-                # Get the user attributes from the decoded token            
-                user_id = decoded_token["sub"]
-                return user_id
+        # The bearer token was already verified by AuthContextMiddleware
+        auth_context = await get_auth_context(request)
+        if auth_context.is_authenticated:
+            # Get the user attributes from the decoded token
+            user_id = auth_context.claims["sub"]
+            return user_id
 
     if request.scope["type"] == "websocket":
         return request.scope["path"]
@@ -60,11 +65,25 @@ async def user_id_identifier(request: Request):
 async def lifespan(app: FastAPI):
     # Startup
     # Load your API key from an environment variable or secret management service
+    await jwks_store.start()
+    await cognito_client.start()
     redis_client = await get_redis_client()
     await FastAPILimiter.init(redis_client, identifier=user_id_identifier)
+    await rate_limit_store.start()
+    await embedding_batcher.start()
+    await password_hash_pool.start()
+    principal_cache.redis = redis_client
+    neural_searchers.get("my_docs")
     print("startup fastapi")
     yield
-    await FastAPILimiter.close()
+    await rate_limit_store.stop()
+    await embedding_batcher.stop()
+    # FastAPILimiter shares the app wide client, closing the pool closes both
+    await redis_pool.close()
+    await jwks_store.stop()
+    await cognito_client.close()
+    password_hash_pool.shutdown()
+    await neural_searchers.close()
     # shutdown
 
 
@@ -87,6 +106,7 @@ app.add_middleware(
     },
 )
 app.add_middleware(GlobalsMiddleware)
+app.add_middleware(AuthContextMiddleware)
 
 # Set all CORS origins enabled
 if settings.BACKEND_CORS_ORIGINS:
@@ -108,33 +128,58 @@ async def root():
 
 
 @app.websocket("/chat/{user_id}")
-async def websocket_endpoint(websocket: WebSocket, user_id: UUID):    
+async def websocket_endpoint(
+    websocket: WebSocket,
+    user_id: UUID,
+    redis_client: Redis = Depends(get_redis_client),
+):
     session_id = str(uuid4())
     key: str = f'user_id:{user_id}:session:{session_id}'    
+    # The handshake must carry a valid bearer token (header or ?token=)
+    auth_context = await get_auth_context(websocket)
+    if not auth_context.is_authenticated:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
     await websocket.accept()
-    redis_client = await get_redis_client()
-    ws_ratelimit = WebSocketRateLimiter(times=200, hours=24)
-    vector_client = get_sync_qdrant_client()
-    embeddings = OpenAIEmbeddings()
+    ws_ratelimit = HybridWebSocketRateLimiter(times=200, hours=24)
+    neural_searcher = neural_searchers.get("my_docs")
+    embeddings = get_langchain_embeddings()
     vectorstore = Qdrant(
-        client=vector_client,
-        collection_name="my_docs",
+        client=neural_searcher.qdrant_client,
+        collection_name=neural_searcher.collection_name,
         embedding_function=embeddings.embed_query,
     )
 
     question_handler = QuestionGenCallbackHandler(websocket)
     stream_handler = StreamingLLMCallbackHandler(websocket)
     chat_history = []
+    # Both retrievers search through neural_searcher, so the chat follows
+    # VECTOR_SEARCH_BACKEND like the REST endpoints
+    retriever = SimilarityRetriever(neural_searcher)
+    if settings.CHAT_RETRIEVER_MODE == "mmr":
+        # Fewer, more diverse chunks in the prompt
+        retriever = MMRRetriever(
+            neural_searcher,
+            fetch_k=settings.CHAT_RETRIEVER_FETCH_K,
+            duplicate_threshold=settings.CHAT_RETRIEVER_DUPLICATE_THRESHOLD,
+        )
     # qa_chain = get_chain(vectorstore, question_handler, stream_handler)
-    qa_chain = get_chain(vectorstore, question_handler, stream_handler)
+    qa_chain = get_chain(
+        vectorstore, question_handler, stream_handler, retriever=retriever
+    )
     
     # Use the below line instead of the above line to enable tracing
     # Ensure `langchain-server` is running
     # qa_chain = get_chain(vectorstore, question_handler, stream_handler, tracing=True)
 
     async with db():
-        user = await crud.user.get_by_id_active(id=user_id)
-        if user != None:            
+        try:
+            user = await resolve_user(auth_context.claims)
+        except Exception as e:
+            logging.error(e)
+            user = None
+        # Only the owner of the token can open a chat for its user id
+        if user != None and user.id == user_id and user.is_active:
             await redis_client.set(key, str(websocket))
     
     
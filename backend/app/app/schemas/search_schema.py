@@ -0,0 +1,70 @@
+from enum import Enum
+from typing import Any
+from pydantic import (
+    BaseModel,
+    Field,
+    StrictBool,
+    StrictInt,
+    StrictStr,
+    root_validator,
+)
+
+
+class ISearchRange(BaseModel):
+    gt: float | None = None
+    gte: float | None = None
+    lt: float | None = None
+    lte: float | None = None
+
+
+class ISearchCondition(BaseModel):
+    key: str
+    # Exactly one of match (equals), any (equals one of) or range. Strict
+    # types keep 4 and "4" apart, as they are for the payload indexes
+    match: StrictBool | StrictInt | StrictStr | None = None
+    any: list[StrictInt] | list[StrictStr] | None = None
+    range: ISearchRange | None = None
+
+    @root_validator(skip_on_failure=True)
+    def check_single_condition(cls, values):
+        conditions = [values.get(name) for name in ("match", "any", "range")]
+        if sum(condition is not None for condition in conditions) != 1:
+            raise ValueError("Set exactly one of match, any or range")
+        return values
+
+
+class ISearchFilter(BaseModel):
+    must: list[ISearchCondition] = []
+    must_not: list[ISearchCondition] = []
+
+
+class ISearchMode(str, Enum):
+    dense = "dense"
+    # BM25 only, no embedding call
+    lexical = "lexical"
+    # Reciprocal rank fusion of dense and lexical
+    hybrid = "hybrid"
+
+
+class ISearchParams(BaseModel):
+    mode: ISearchMode = ISearchMode.dense
+    limit: int = Field(5, ge=1, le=100)
+    offset: int = Field(0, ge=0)
+    # Minimum cosine similarity of the dense results (dense and hybrid modes)
+    score_threshold: float | None = None
+    # Payload keys to return, all of them when not set
+    fields: list[str] | None = None
+    # Higher hnsw_ef gives better recall and slower searches
+    hnsw_ef: int | None = Field(None, ge=1)
+    exact: bool = False
+    # Re-rank quantized candidates with the original vectors, the collection
+    # profile decides when not set
+    rescore: bool | None = None
+    # Applied by Qdrant while searching, use indexed payload keys
+    filter: ISearchFilter | None = None
+
+
+class ISearchHit(BaseModel):
+    id: int | str
+    score: float
+    payload: dict[str, Any] | None = None
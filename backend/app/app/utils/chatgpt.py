@@ -1,6 +1,7 @@
 from uuid import UUID
-import openai
 import tiktoken
+from app.utils.embedding_batcher import embedding_batcher
+from app.utils.embedding_cache import embedding_cache, normalize_text
 
 
 def num_tokens_from_messages(
@@ -31,6 +32,10 @@ def num_tokens_from_messages(
 
 
 def get_embedding(text, model="text-embedding-ada-002", user_id: str | UUID = "001"):
-    text = text.replace("\n", " ")
-    user_id = str(user_id) if isinstance(user_id, UUID) else user_id
-    return openai.Embedding.create(input=[text], model=model, user=user_id)["data"][0]["embedding"]
+    text = normalize_text(text)
+    embedding = embedding_cache.get(model, text)
+    if embedding is not None:
+        return embedding
+    embedding = embedding_batcher.embed_sync(text, model)
+    embedding_cache.set(model, text, embedding)
+    return embedding
@@ -0,0 +1,243 @@
+import asyncio
+import itertools
+import logging
+import threading
+from dataclasses import dataclass, field
+import openai
+import tiktoken
+from app.core.config import settings
+
+
+@dataclass
+class _PendingBatch:
+    # Callers waiting for each distinct text
+    waiters: dict[str, list[asyncio.Future]] = field(default_factory=dict)
+    tokens: int = 0
+    timer: asyncio.TimerHandle | None = None
+
+
+class EmbeddingBatcher:
+    """
+    Coalesces the embedding requests of concurrent callers into one OpenAI
+    call per model.
+
+    Texts wait at most `max_delay` seconds, or until the batch reaches
+    `max_batch_size` distinct texts or `max_batch_tokens` tokens, then a
+    single `Embedding.acreate` is sent and every caller gets its own vector.
+    Equal texts in a batch are embedded once. Batches are sent without the
+    per user `user` field, as they mix callers.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        max_delay: float = 0.005,
+        max_batch_size: int = 512,
+        max_batch_tokens: int = 50_000,
+        max_concurrency: int = 8,
+        sync_timeout: float = 60,
+    ):
+        self.api_key = api_key
+        self.max_delay = max_delay
+        self.max_batch_size = max_batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.max_concurrency = max_concurrency
+        self.sync_timeout = sync_timeout
+        self.requests = 0
+        self.batches = 0
+        self.inputs = 0
+        self.errors = 0
+        self._pending: dict[str, _PendingBatch] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self._semaphore: asyncio.Semaphore | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread_id: int | None = None
+        self._encoding: tiktoken.Encoding | None = None
+        self._encoding_task: asyncio.Task | None = None
+
+    def count_tokens(self, text: str) -> int:
+        if self._encoding is None:
+            # Until the encoding is loaded, or if it cannot be. Tokens average
+            # ~4 characters, 3 overestimates to stay within the budgets
+            return len(text) // 3 + 1
+        return len(self._encoding.encode(text, disallowed_special=()))
+
+    async def _load_encoding(self) -> None:
+        # tiktoken downloads the encoding on first use, keep it off the loop
+        try:
+            self._encoding = await asyncio.to_thread(
+                tiktoken.get_encoding, "cl100k_base"
+            )
+        except Exception as e:
+            logging.error(f"Error loading tiktoken encoding, estimating tokens: {e}")
+
+    async def embed(self, text: str, model: str) -> list[float]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.requests += 1
+        batch = self._pending.get(model)
+        is_new_text = batch is None or text not in batch.waiters
+        tokens = self.count_tokens(text) if is_new_text else 0
+        if batch is not None and batch.tokens + tokens > self.max_batch_tokens:
+            self._flush(model)
+            batch = None
+        if batch is None:
+            batch = _PendingBatch()
+            batch.timer = loop.call_later(self.max_delay, self._flush, model)
+            self._pending[model] = batch
+        batch.tokens += tokens
+        batch.waiters.setdefault(text, []).append(future)
+        if len(batch.waiters) >= self.max_batch_size:
+            self._flush(model)
+        return await future
+
+    async def embed_many(self, texts: list[str], model: str) -> list[list[float]]:
+        return list(await asyncio.gather(*(self.embed(text, model) for text in texts)))
+
+    def _flush(self, model: str) -> None:
+        batch = self._pending.pop(model, None)
+        if batch is None:
+            return
+        if batch.timer is not None:
+            batch.timer.cancel()
+        task = asyncio.create_task(self._send(model, batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _create(self, texts: list[str], model: str) -> list[list[float]]:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        try:
+            async with self._semaphore:
+                response = await openai.Embedding.acreate(
+                    input=texts, model=model, api_key=self.api_key
+                )
+        except Exception:
+            self.errors += 1
+            raise
+        self.batches += 1
+        self.inputs += len(texts)
+        data = sorted(response["data"], key=lambda item: item["index"])
+        return [item["embedding"] for item in data]
+
+    async def _send(self, model: str, batch: _PendingBatch) -> None:
+        texts = list(batch.waiters)
+        try:
+            embeddings = await self._create(texts, model)
+        except Exception as e:
+            for futures in batch.waiters.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+        for text, embedding in zip(texts, embeddings, strict=True):
+            for future in batch.waiters[text]:
+                # Callers may have been cancelled while waiting
+                if not future.done():
+                    future.set_result(embedding)
+
+    def chunk_by_tokens(self, texts: list[str], max_tokens: int) -> list[list[str]]:
+        """
+        Splits `texts` in order into chunks of at most `max_tokens` tokens and
+        `max_batch_size` texts. A text longer than the budget gets its own
+        chunk.
+        """
+        chunks: list[list[str]] = []
+        chunk: list[str] = []
+        chunk_tokens = 0
+        for text in texts:
+            tokens = self.count_tokens(text)
+            if chunk and (
+                chunk_tokens + tokens > max_tokens
+                or len(chunk) >= self.max_batch_size
+            ):
+                chunks.append(chunk)
+                chunk, chunk_tokens = [], 0
+            chunk.append(text)
+            chunk_tokens += tokens
+        if chunk:
+            chunks.append(chunk)
+        return chunks
+
+    async def embed_chunked(
+        self, texts: list[str], model: str, max_chunk_tokens: int
+    ) -> list[list[float]]:
+        """
+        For large requests, where waiting for other callers buys nothing:
+        distinct texts are split into token bounded chunks that are sent
+        concurrently (up to `max_concurrency` at a time), so the request
+        takes about as long as its slowest chunk. Embeddings keep the order
+        of `texts`.
+        """
+        distinct = list(dict.fromkeys(texts))
+        chunks = self.chunk_by_tokens(distinct, max_chunk_tokens)
+        results = await asyncio.gather(
+            *(self._create(chunk, model) for chunk in chunks)
+        )
+        embeddings = dict(
+            zip(distinct, itertools.chain.from_iterable(results), strict=True)
+        )
+        return [embeddings[text] for text in texts]
+
+    def embed_many_sync(self, texts: list[str], model: str) -> list[list[float]]:
+        """
+        For sync callers. Worker threads join the batches of the app's event
+        loop, the event loop thread itself (e.g. langchain's sync retrieval)
+        cannot wait on it and calls OpenAI directly.
+        """
+        if (
+            self._loop is not None
+            and self._loop.is_running()
+            and threading.get_ident() != self._loop_thread_id
+        ):
+            future = asyncio.run_coroutine_threadsafe(
+                self.embed_many(texts, model), self._loop
+            )
+            return future.result(timeout=self.sync_timeout)
+        response = openai.Embedding.create(
+            input=texts, model=model, api_key=self.api_key
+        )
+        data = sorted(response["data"], key=lambda item: item["index"])
+        return [item["embedding"] for item in data]
+
+    def embed_sync(self, text: str, model: str) -> list[float]:
+        return self.embed_many_sync([text], model)[0]
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        # Not awaited, a slow or unreachable download must not block startup
+        if self._encoding is None and self._encoding_task is None:
+            self._encoding_task = asyncio.create_task(self._load_encoding())
+
+    async def stop(self) -> None:
+        for model in list(self._pending):
+            self._flush(model)
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._encoding_task is not None:
+            self._encoding_task.cancel()
+            self._encoding_task = None
+        self._loop = None
+        self._loop_thread_id = None
+
+    def stats(self) -> dict[str, int | float]:
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "inputs": self.inputs,
+            "errors": self.errors,
+            "avg_batch_size": self.inputs / self.batches if self.batches else 0.0,
+            "upstream_calls_saved": max(self.requests - self.batches, 0),
+            "pending": sum(len(batch.waiters) for batch in self._pending.values()),
+        }
+
+
+embedding_batcher = EmbeddingBatcher(
+    api_key=settings.OPENAI_API_KEY,
+    max_delay=settings.EMBEDDING_BATCH_MAX_DELAY_MS / 1000,
+    max_batch_size=settings.EMBEDDING_BATCH_MAX_SIZE,
+    max_batch_tokens=settings.EMBEDDING_BATCH_MAX_TOKENS,
+    max_concurrency=settings.EMBEDDING_BATCH_MAX_CONCURRENCY,
+)
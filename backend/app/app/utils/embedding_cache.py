@@ -0,0 +1,165 @@
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+import numpy as np
+from langchain.embeddings import OpenAIEmbeddings
+from app.core.config import settings
+from app.db.redis import RedisPool, redis_pool
+from app.utils.embedding_batcher import embedding_batcher
+
+
+def normalize_text(text: str) -> str:
+    """
+    Collapses every run of whitespace (newlines included) into a single space,
+    the embedded text is always the normalized one so equal keys mean equal
+    vectors.
+    """
+    return " ".join(text.split())
+
+
+class EmbeddingCache:
+    """
+    Content addressed cache of embeddings keyed by model plus normalized text.
+
+    The local tier is an LRU of float32 arrays per worker, the Redis tier is
+    shared by all workers and stores the raw float32 bytes (6 KB per ada-002
+    vector instead of ~30 KB of JSON). Sync methods are for callers that
+    cannot await, e.g. langchain's `embed_query`, they block on Redis and
+    must run in a worker thread, never on the event loop.
+    """
+
+    def __init__(
+        self,
+        pool: RedisPool,
+        max_size: int = 5_000,
+        redis_ttl: int = 60 * 60 * 24 * 7,
+        prefix: str = "embedding",
+    ):
+        self.pool = pool
+        self.max_size = max_size
+        self.redis_ttl = redis_ttl
+        self.prefix = prefix
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self._local: OrderedDict[str, np.ndarray] = OrderedDict()
+        # Sync lookups may run in worker threads (asyncify)
+        self._lock = threading.Lock()
+
+    def _key(self, model: str, text: str) -> str:
+        digest = hashlib.sha256(f"{model}\n{normalize_text(text)}".encode("utf-8"))
+        return f"{self.prefix}:{digest.hexdigest()}"
+
+    def _get_local(self, key: str) -> list[float] | None:
+        with self._lock:
+            vector = self._local.get(key)
+            if vector is not None:
+                self._local.move_to_end(key)
+                self.local_hits += 1
+                return vector.tolist()
+        return None
+
+    def _set_local(self, key: str, vector: np.ndarray) -> None:
+        with self._lock:
+            self._local[key] = vector
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_size:
+                self._local.popitem(last=False)
+
+    def _from_redis(self, key: str, raw: bytes | None) -> list[float] | None:
+        if raw is None:
+            self.misses += 1
+            return None
+        vector = np.frombuffer(raw, dtype=np.float32)
+        self.redis_hits += 1
+        self._set_local(key, vector)
+        return vector.tolist()
+
+    def get(self, model: str, text: str) -> list[float] | None:
+        key = self._key(model, text)
+        embedding = self._get_local(key)
+        if embedding is not None:
+            return embedding
+        raw = None
+        try:
+            raw = self.pool.get_sync_binary_client().get(key)
+        except Exception as e:
+            logging.error(f"Error reading embedding cache: {e}")
+        return self._from_redis(key, raw)
+
+    def set(self, model: str, text: str, embedding: list[float]) -> None:
+        key = self._key(model, text)
+        vector = np.asarray(embedding, dtype=np.float32)
+        self._set_local(key, vector)
+        try:
+            self.pool.get_sync_binary_client().set(
+                key, vector.tobytes(), ex=self.redis_ttl
+            )
+        except Exception as e:
+            logging.error(f"Error writing embedding cache: {e}")
+
+    async def aget(self, model: str, text: str) -> list[float] | None:
+        key = self._key(model, text)
+        embedding = self._get_local(key)
+        if embedding is not None:
+            return embedding
+        raw = None
+        try:
+            raw = await self.pool.get_binary_client().get(key)
+        except Exception as e:
+            logging.error(f"Error reading embedding cache: {e}")
+        return self._from_redis(key, raw)
+
+    async def aset(self, model: str, text: str, embedding: list[float]) -> None:
+        key = self._key(model, text)
+        vector = np.asarray(embedding, dtype=np.float32)
+        self._set_local(key, vector)
+        try:
+            await self.pool.get_binary_client().set(
+                key, vector.tobytes(), ex=self.redis_ttl
+            )
+        except Exception as e:
+            logging.error(f"Error writing embedding cache: {e}")
+
+    def cache_info(self) -> dict[str, int | float]:
+        lookups = self.local_hits + self.redis_hits + self.misses
+        return {
+            "local_hits": self.local_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "hit_ratio": (self.local_hits + self.redis_hits) / lookups
+            if lookups
+            else 0.0,
+            "local_size": len(self._local),
+            "max_size": self.max_size,
+        }
+
+
+embedding_cache = EmbeddingCache(
+    pool=redis_pool,
+    max_size=settings.EMBEDDING_CACHE_MAX_SIZE,
+    redis_ttl=settings.EMBEDDING_CACHE_REDIS_TTL,
+)
+
+
+class CachedOpenAIEmbeddings(OpenAIEmbeddings):
+    """
+    `OpenAIEmbeddings` whose `embed_query` goes through `embedding_cache`, so
+    the retrieval of the chat chain reuses the vectors of repeated questions.
+    Upstream calls go through `embedding_batcher`.
+    """
+
+    def embed_query(self, text: str) -> list[float]:
+        text = normalize_text(text)
+        embedding = embedding_cache.get(self.query_model_name, text)
+        if embedding is None:
+            embedding = embedding_batcher.embed_sync(text, self.query_model_name)
+            embedding_cache.set(self.query_model_name, text, embedding)
+        return embedding
+
+    def embed_documents(
+        self, texts: list[str], chunk_size: int | None = 0
+    ) -> list[list[float]]:
+        texts = [normalize_text(text) for text in texts]
+        return embedding_batcher.embed_many_sync(texts, self.document_model_name)
@@ -0,0 +1,152 @@
+import json
+import os
+import re
+from collections import Counter
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"\w+(?:[.\-/]\w+)*")
+
+
+def tokenize(text: str | None) -> list[str]:
+    """
+    Lowercased word tokens. Dotted, dashed and slashed tokens such as article
+    numbers ("5.2", "1983-a", "2016/679") are kept whole.
+    """
+    if not text:
+        return []
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class BM25Index:
+    """
+    Okapi BM25 inverted index held in compact CSR arrays: for every term, the
+    indexes of the documents that contain it and the precomputed BM25 weight
+    of the term in each one. A query is a few slice additions into a score
+    array, so keyword lookups need no embedding and no network call.
+
+    Snapshots are `bm25.npz` (the arrays) plus `bm25.json` (point ids and the
+    vocabulary in term id order).
+    """
+
+    ARRAYS_FILE = "bm25.npz"
+    META_FILE = "bm25.json"
+
+    def __init__(
+        self,
+        ids: list[int | str],
+        vocabulary: list[str],
+        indptr: np.ndarray,
+        doc_indices: np.ndarray,
+        weights: np.ndarray,
+    ):
+        self.ids = ids
+        self.vocabulary = vocabulary
+        self.term_ids = {term: term_id for term_id, term in enumerate(vocabulary)}
+        self.indptr = indptr
+        self.doc_indices = doc_indices
+        self.weights = weights
+
+    @classmethod
+    def build(
+        cls,
+        ids: list[int | str],
+        texts: list[str | None],
+        k1: float = 1.5,
+        b: float = 0.75,
+    ) -> "BM25Index":
+        term_ids: dict[str, int] = {}
+        posting_terms: list[int] = []
+        posting_docs: list[int] = []
+        posting_tfs: list[int] = []
+        doc_lengths = np.zeros(len(texts), dtype=np.float32)
+        for doc_index, text in enumerate(texts):
+            tokens = tokenize(text)
+            doc_lengths[doc_index] = len(tokens)
+            for term, tf in Counter(tokens).items():
+                posting_terms.append(term_ids.setdefault(term, len(term_ids)))
+                posting_docs.append(doc_index)
+                posting_tfs.append(tf)
+
+        terms = np.array(posting_terms, dtype=np.int64)
+        docs = np.array(posting_docs, dtype=np.int32)
+        tfs = np.array(posting_tfs, dtype=np.float32)
+        # Group the postings by term, documents stay sorted inside each term
+        order = np.argsort(terms, kind="stable")
+        terms, docs, tfs = terms[order], docs[order], tfs[order]
+        doc_freqs = np.bincount(terms, minlength=len(term_ids))
+        indptr = np.concatenate(([0], np.cumsum(doc_freqs))).astype(np.int64)
+
+        n_docs = len(texts)
+        idf = np.log1p((n_docs - doc_freqs + 0.5) / (doc_freqs + 0.5))
+        avg_length = doc_lengths.mean() if n_docs and doc_lengths.mean() else 1.0
+        norms = k1 * (1 - b + b * doc_lengths[docs] / avg_length)
+        weights = (idf[terms] * tfs * (k1 + 1) / (tfs + norms)).astype(np.float32)
+
+        vocabulary = [""] * len(term_ids)
+        for term, term_id in term_ids.items():
+            vocabulary[term_id] = term
+        return cls(ids, vocabulary, indptr, docs, weights)
+
+    def save(self, path: str) -> None:
+        os.makedirs(path, exist_ok=True)
+        np.savez(
+            os.path.join(path, self.ARRAYS_FILE),
+            indptr=self.indptr,
+            doc_indices=self.doc_indices,
+            weights=self.weights,
+        )
+        with open(os.path.join(path, self.META_FILE), "w") as f:
+            json.dump({"ids": self.ids, "vocabulary": self.vocabulary}, f)
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        arrays = np.load(os.path.join(path, cls.ARRAYS_FILE))
+        with open(os.path.join(path, cls.META_FILE)) as f:
+            meta = json.load(f)
+        return cls(
+            ids=meta["ids"],
+            vocabulary=meta["vocabulary"],
+            indptr=arrays["indptr"],
+            doc_indices=arrays["doc_indices"],
+            weights=arrays["weights"],
+        )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def scores(self, text: str) -> np.ndarray:
+        scores = np.zeros(len(self), dtype=np.float32)
+        for term, query_tf in Counter(tokenize(text)).items():
+            term_id = self.term_ids.get(term)
+            if term_id is None:
+                continue
+            start, end = self.indptr[term_id], self.indptr[term_id + 1]
+            # A document appears once per term, so the fancy index add is safe
+            scores[self.doc_indices[start:end]] += query_tf * self.weights[start:end]
+        return scores
+
+    def search(self, text: str, limit: int) -> list[tuple[int | str, float]]:
+        """
+        Best `limit` (point id, BM25 score) pairs, documents without any
+        query term are never returned.
+        """
+        scores = self.scores(text)
+        candidates = np.flatnonzero(scores)
+        if len(candidates) > limit:
+            top = np.argpartition(-scores[candidates], limit - 1)[:limit]
+            candidates = candidates[top]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(self.ids[index], float(scores[index])) for index in candidates]
+
+
+def reciprocal_rank_fusion(
+    rankings: list[list[int | str]], k: int = 60
+) -> list[tuple[int | str, float]]:
+    """
+    Fuses ranked id lists with RRF, score(id) = sum of 1 / (k + rank).
+    """
+    fused: dict[int | str, float] = {}
+    for ranking in rankings:
+        for rank, point_id in enumerate(ranking, start=1):
+            fused[point_id] = fused.get(point_id, 0.0) + 1 / (k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
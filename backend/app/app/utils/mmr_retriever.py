@@ -0,0 +1,143 @@
+import numpy as np
+from langchain.schema import BaseRetriever, Document
+from qdrant_client.http import models
+from app.utils.neural_searcher import NeuralSearcher
+
+
+def maximal_marginal_relevance(
+    query: np.ndarray,
+    candidates: np.ndarray,
+    k: int = 4,
+    lambda_mult: float = 0.5,
+    duplicate_threshold: float | None = 0.95,
+) -> list[int]:
+    """
+    Indexes of up to `k` candidates picked by maximal marginal relevance.
+
+    Candidates whose cosine similarity to an already selected one reaches
+    `duplicate_threshold` are dropped as near duplicates. The candidate
+    similarity matrix is computed once, each pick is then a few vector
+    operations over all candidates.
+    """
+    if len(candidates) == 0 or k <= 0:
+        return []
+    candidates = np.asarray(candidates, dtype=np.float32)
+    candidates = candidates / np.maximum(
+        np.linalg.norm(candidates, axis=1, keepdims=True), 1e-12
+    )
+    query = np.asarray(query, dtype=np.float32)
+    query = query / max(float(np.linalg.norm(query)), 1e-12)
+    relevance = candidates @ query
+    similarity = candidates @ candidates.T
+
+    # Highest similarity of every candidate to the selected ones
+    redundancy = np.full(len(candidates), -np.inf, dtype=np.float32)
+    available = np.ones(len(candidates), dtype=bool)
+    selected: list[int] = []
+    while len(selected) < k and available.any():
+        if selected:
+            scores = lambda_mult * relevance - (1 - lambda_mult) * redundancy
+        else:
+            scores = relevance.copy()
+        scores[~available] = -np.inf
+        pick = int(np.argmax(scores))
+        selected.append(pick)
+        available[pick] = False
+        redundancy = np.maximum(redundancy, similarity[pick])
+        if duplicate_threshold is not None:
+            available &= similarity[pick] < duplicate_threshold
+    return selected
+
+
+class SimilarityRetriever(BaseRetriever):
+    """
+    Plain top-`k` chat retriever over a `NeuralSearcher`, so the chat
+    searches the same backend (`VECTOR_SEARCH_BACKEND`) as the REST
+    endpoints. Documents are built from the payload like langchain's Qdrant
+    vector store does.
+    """
+
+    def __init__(
+        self,
+        searcher: NeuralSearcher,
+        k: int = 4,
+        content_payload_key: str = "page_content",
+        metadata_payload_key: str = "metadata",
+    ):
+        self.searcher = searcher
+        self.k = k
+        self.content_payload_key = content_payload_key
+        self.metadata_payload_key = metadata_payload_key
+
+    def _document(self, point: models.ScoredPoint) -> Document:
+        payload = point.payload or {}
+        return Document(
+            page_content=payload.get(self.content_payload_key) or "",
+            metadata=payload.get(self.metadata_payload_key) or {},
+        )
+
+    def get_relevant_documents(self, query: str) -> list[Document]:
+        query_vector = self.searcher.get_embedding(text=query, user_id="001")
+        points = self.searcher.search_by_vector(query_vector, limit=self.k)
+        return [self._document(point) for point in points]
+
+    async def aget_relevant_documents(self, query: str) -> list[Document]:
+        query_vector = await self.searcher.aget_embedding(text=query, user_id="001")
+        points = await self.searcher.asearch_by_vector(query_vector, limit=self.k)
+        return [self._document(point) for point in points]
+
+
+class MMRRetriever(SimilarityRetriever):
+    """
+    Chat retriever that over-fetches `fetch_k` candidates with their vectors
+    and keeps `k` relevant but diverse, non duplicated, chunks for the
+    "stuff" prompt.
+    """
+
+    def __init__(
+        self,
+        searcher: NeuralSearcher,
+        k: int = 4,
+        fetch_k: int = 20,
+        lambda_mult: float = 0.5,
+        duplicate_threshold: float | None = 0.95,
+        content_payload_key: str = "page_content",
+        metadata_payload_key: str = "metadata",
+    ):
+        if not 1 <= k <= fetch_k:
+            raise ValueError(
+                f"MMR needs 1 <= k <= fetch_k, got k={k} and fetch_k={fetch_k}"
+            )
+        super().__init__(searcher, k, content_payload_key, metadata_payload_key)
+        self.fetch_k = fetch_k
+        self.lambda_mult = lambda_mult
+        self.duplicate_threshold = duplicate_threshold
+
+    def _select(
+        self, query_vector: list[float], points: list[models.ScoredPoint]
+    ) -> list[Document]:
+        points = [point for point in points if point.vector is not None]
+        if not points:
+            return []
+        indexes = maximal_marginal_relevance(
+            np.array(query_vector, dtype=np.float32),
+            np.array([point.vector for point in points], dtype=np.float32),
+            k=self.k,
+            lambda_mult=self.lambda_mult,
+            duplicate_threshold=self.duplicate_threshold,
+        )
+        return [self._document(points[index]) for index in indexes]
+
+    def get_relevant_documents(self, query: str) -> list[Document]:
+        query_vector = self.searcher.get_embedding(text=query, user_id="001")
+        points = self.searcher.search_by_vector(
+            query_vector, limit=self.fetch_k, with_vector=True
+        )
+        return self._select(query_vector, points)
+
+    async def aget_relevant_documents(self, query: str) -> list[Document]:
+        query_vector = await self.searcher.aget_embedding(text=query, user_id="001")
+        points = await self.searcher.asearch_by_vector(
+            query_vector, limit=self.fetch_k, with_vector=True
+        )
+        return self._select(query_vector, points)
@@ -1,7 +1,25 @@
+import logging
+import os
+import time
 from typing import Any
 from uuid import UUID
 import openai
-from qdrant_client import QdrantClient
+from grpc import aio as grpc_aio, ssl_channel_credentials
+from qdrant_client import QdrantClient, grpc
+from qdrant_client.conversions.conversion import GrpcToRest, RestToGrpc
+from qdrant_client.http import AsyncApis, models
+from qdrant_client.http.exceptions import UnexpectedResponse
+from app.schemas.search_schema import (
+    ISearchCondition,
+    ISearchFilter,
+    ISearchHit,
+    ISearchMode,
+    ISearchParams,
+)
+from app.utils.embedding_batcher import EmbeddingBatcher
+from app.utils.embedding_cache import EmbeddingCache, normalize_text
+from app.utils.lexical_index import BM25Index, reciprocal_rank_fusion
+from app.utils.vector_index import LocalVectorIndex
 
 
 class NeuralSearcher:
@@ -16,40 +34,628 @@ class NeuralSearcher:
         is_cloud_qdrant: bool = False,
         url: str | None = None,
         api_key: str | None = None,
+        prefer_grpc: bool = False,
+        timeout: int | None = None,
+        embedding_cache: EmbeddingCache | None = None,
+        embedding_batcher: EmbeddingBatcher | None = None,
+        local_index: LocalVectorIndex | None = None,
+        lexical_index: BM25Index | None = None,
+        rescore: bool | None = None,
         **kwargs: Any,
     ):
         self.collection_name = collection_name
+        # Searches run in process on this index instead of Qdrant when set
+        self.local_index = local_index
+        # Enables the lexical and hybrid search modes
+        self.lexical_index = lexical_index
+        # Default rescoring of quantized collections
+        self.rescore = rescore
         # Initialize encoder model
         self.embedding_model = embedding_model
+        self.embedding_cache = embedding_cache
+        # Coalesces the OpenAI calls of concurrent searches when set
+        self.embedding_batcher = embedding_batcher
         self.chat_model = chat_model
         # initialize Qdrant client
+        self.prefer_grpc = prefer_grpc
+        self.timeout = timeout
+        kwargs.update(prefer_grpc=prefer_grpc, timeout=timeout)
         self.qdrant_client: QdrantClient = (
             QdrantClient(url=url, api_key=api_key, **kwargs)
             if is_cloud_qdrant
             else QdrantClient(host=host, port=port, **kwargs)
         )
+        # The async clients are opened by the first async search
+        self._async_http: AsyncApis | None = None
+        self._async_grpc_channel: grpc_aio.Channel | None = None
+        self._async_grpc_points: grpc.PointsStub | None = None
         self.openai = openai
-        self.openai.api_key = openai_api_key
+        # The key is sent per call instead of overwriting the global openai.api_key
+        self.openai_api_key = openai_api_key
 
     def get_embedding(self, text: str, user_id: str | UUID):
-        text = text.replace("\n", " ")
-        user_id = str(user_id) if isinstance(user_id, UUID) else user_id
-        return self.openai.Embedding.create(input=[text], model=self.embedding_model, user=user_id)[
-            "data"
-        ][0]["embedding"]
+        text = normalize_text(text)
+        if self.embedding_cache is not None:
+            embedding = self.embedding_cache.get(self.embedding_model, text)
+            if embedding is not None:
+                return embedding
+        if self.embedding_batcher is not None:
+            embedding = self.embedding_batcher.embed_sync(text, self.embedding_model)
+        else:
+            user_id = str(user_id) if isinstance(user_id, UUID) else user_id
+            embedding = self.openai.Embedding.create(
+                input=[text],
+                model=self.embedding_model,
+                user=user_id,
+                api_key=self.openai_api_key,
+            )["data"][0]["embedding"]
+        if self.embedding_cache is not None:
+            self.embedding_cache.set(self.embedding_model, text, embedding)
+        return embedding
 
-    def search(self, text: str, user_id: str | UUID ="001") -> list[dict[str, str]]:
-        # Convert text query into vector
-        vector = self.get_embedding(text=text, user_id=user_id)
+    async def aget_embedding(self, text: str, user_id: str | UUID):
+        text = normalize_text(text)
+        if self.embedding_cache is not None:
+            embedding = await self.embedding_cache.aget(self.embedding_model, text)
+            if embedding is not None:
+                return embedding
+        if self.embedding_batcher is not None:
+            embedding = await self.embedding_batcher.embed(text, self.embedding_model)
+        else:
+            user_id = str(user_id) if isinstance(user_id, UUID) else user_id
+            response = await self.openai.Embedding.acreate(
+                input=[text],
+                model=self.embedding_model,
+                user=user_id,
+                api_key=self.openai_api_key,
+            )
+            embedding = response["data"][0]["embedding"]
+        if self.embedding_cache is not None:
+            await self.embedding_cache.aset(self.embedding_model, text, embedding)
+        return embedding
+
+    async def aget_embeddings(
+        self, texts: list[str], user_id: str | UUID
+    ) -> list[list[float]]:
+        """
+        Embeds many texts with at most one OpenAI call (shared with concurrent
+        callers through the batcher), for the texts missing from the embedding
+        cache. Embeddings keep the order of `texts`.
+        """
+        texts = [normalize_text(text) for text in texts]
+        embeddings: dict[str, list[float]] = {}
+        if self.embedding_cache is not None:
+            for text in set(texts):
+                embedding = await self.embedding_cache.aget(self.embedding_model, text)
+                if embedding is not None:
+                    embeddings[text] = embedding
+        missing = list(dict.fromkeys(text for text in texts if text not in embeddings))
+        vectors: list[list[float]] = []
+        if missing and self.embedding_batcher is not None:
+            vectors = await self.embedding_batcher.embed_many(
+                missing, self.embedding_model
+            )
+        elif missing:
+            user_id = str(user_id) if isinstance(user_id, UUID) else user_id
+            response = await self.openai.Embedding.acreate(
+                input=missing,
+                model=self.embedding_model,
+                user=user_id,
+                api_key=self.openai_api_key,
+            )
+            data = sorted(response["data"], key=lambda item: item["index"])
+            vectors = [item["embedding"] for item in data]
+        for text, vector in zip(missing, vectors, strict=True):
+            embeddings[text] = vector
+            if self.embedding_cache is not None:
+                await self.embedding_cache.aset(self.embedding_model, text, vector)
+        return [embeddings[text] for text in texts]
+
+    @property
+    def async_http(self) -> AsyncApis:
+        if self._async_http is None:
+            # Same uri, headers, http2, limits and timeout as the sync client
+            remote = self.qdrant_client._client
+            self._async_http = AsyncApis(host=remote.rest_uri, **remote._rest_args)
+        return self._async_http
+
+    @property
+    def async_grpc_points(self) -> grpc.PointsStub:
+        """
+        qdrant-client 1.1.5 only has blocking gRPC stubs, this one runs on a
+        `grpc.aio` channel to the host and gRPC port of the sync client.
+        """
+        if self._async_grpc_points is None:
+            remote = self.qdrant_client._client
+            target = f"{remote._host}:{remote._grpc_port}"
+            self._async_grpc_channel = (
+                grpc_aio.secure_channel(target, ssl_channel_credentials())
+                if remote._https
+                else grpc_aio.insecure_channel(target)
+            )
+            self._async_grpc_points = grpc.PointsStub(self._async_grpc_channel)
+        return self._async_grpc_points
+
+    @property
+    def _grpc_metadata(self) -> list[tuple[str, str]]:
+        # The api-key header, sent per call
+        return list(self.qdrant_client._client._grpc_headers)
+
+    async def _asearch_points(
+        self, search_request: models.SearchRequest
+    ) -> list[models.ScoredPoint]:
+        if self.local_index is not None:
+            return self.local_index.search(search_request)
+        if self.prefer_grpc:
+            response = await self.async_grpc_points.Search(
+                RestToGrpc.convert_search_request(search_request, self.collection_name),
+                timeout=self.timeout,
+                metadata=self._grpc_metadata,
+            )
+            return [GrpcToRest.convert_scored_point(hit) for hit in response.result]
+        response = await self.async_http.points_api.search_points(
+            collection_name=self.collection_name, search_request=search_request
+        )
+        return response.result
 
+    def _search_points(
+        self, search_request: models.SearchRequest
+    ) -> list[models.ScoredPoint]:
+        if self.local_index is not None:
+            return self.local_index.search(search_request)
         # Use `vector` for search for closest vectors in the collection
-        search_result = self.qdrant_client.search(
+        return self.qdrant_client.search(
             collection_name=self.collection_name,
-            query_vector=vector,
-            query_filter=None,  # We don't want any filters for now
-            top=5,  # 5 the most closest results is enough
-        )
-        # `search_result` contains found vector ids with similarity scores along with the stored payload
-        # In this function we are interested in payload only
-        payloads = [hit.payload for hit in search_result]
-        return payloads
+            query_vector=search_request.vector,
+            query_filter=search_request.filter,
+            search_params=search_request.params,
+            limit=search_request.limit,
+            offset=search_request.offset,
+            with_payload=search_request.with_payload,
+            with_vectors=search_request.with_vector,
+            score_threshold=search_request.score_threshold,
+        )
+
+    async def _asearch_batch_points(
+        self, search_requests: list[models.SearchRequest]
+    ) -> list[list[models.ScoredPoint]]:
+        if self.local_index is not None:
+            return self.local_index.search_batch(search_requests)
+        if self.prefer_grpc:
+            response = await self.async_grpc_points.SearchBatch(
+                grpc.SearchBatchPoints(
+                    collection_name=self.collection_name,
+                    search_points=[
+                        RestToGrpc.convert_search_request(
+                            search_request, self.collection_name
+                        )
+                        for search_request in search_requests
+                    ],
+                ),
+                timeout=self.timeout,
+                metadata=self._grpc_metadata,
+            )
+            return [
+                [GrpcToRest.convert_scored_point(hit) for hit in batch.result]
+                for batch in response.result
+            ]
+        response = await self.async_http.points_api.search_batch_points(
+            collection_name=self.collection_name,
+            search_request_batch=models.SearchRequestBatch(searches=search_requests),
+        )
+        return response.result
+
+    @staticmethod
+    def _field_condition(condition: ISearchCondition) -> models.FieldCondition:
+        if condition.match is not None:
+            return models.FieldCondition(
+                key=condition.key, match=models.MatchValue(value=condition.match)
+            )
+        if condition.any is not None:
+            return models.FieldCondition(
+                key=condition.key, match=models.MatchAny(any=condition.any)
+            )
+        return models.FieldCondition(
+            key=condition.key, range=models.Range(**condition.range.dict())
+        )
+
+    def _qdrant_filter(self, filter: ISearchFilter | None) -> models.Filter | None:
+        if filter is None or not (filter.must or filter.must_not):
+            return None
+        return models.Filter(
+            must=[self._field_condition(condition) for condition in filter.must]
+            or None,
+            must_not=[self._field_condition(condition) for condition in filter.must_not]
+            or None,
+        )
+
+    def _search_params(self, params: ISearchParams) -> models.SearchParams:
+        rescore = params.rescore if params.rescore is not None else self.rescore
+        return models.SearchParams(
+            hnsw_ef=params.hnsw_ef,
+            exact=params.exact,
+            quantization=models.QuantizationSearchParams(rescore=rescore)
+            if rescore is not None
+            else None,
+        )
+
+    def _vector_search_request(
+        self, vector: list[float], limit: int, with_vector: bool
+    ) -> models.SearchRequest:
+        # For internal callers, not bound by the limits of the API's ISearchParams
+        return models.SearchRequest(
+            vector=vector,
+            limit=limit,
+            with_payload=True,
+            with_vector=with_vector,
+            params=models.SearchParams(
+                quantization=models.QuantizationSearchParams(rescore=self.rescore)
+                if self.rescore is not None
+                else None,
+            ),
+        )
+
+    @staticmethod
+    def _with_payload(params: ISearchParams) -> models.PayloadSelector | bool:
+        if params.fields is not None:
+            return models.PayloadSelectorInclude(include=params.fields)
+        return True
+
+    def _search_request(
+        self, vector: list[float], params: ISearchParams
+    ) -> models.SearchRequest:
+        return models.SearchRequest(
+            vector=vector,
+            filter=self._qdrant_filter(params.filter),
+            limit=params.limit,
+            offset=params.offset,
+            score_threshold=params.score_threshold,
+            with_payload=self._with_payload(params),
+            # Vectors are never returned, they are ~6 KB each
+            with_vector=False,
+            params=self._search_params(params),
+        )
+
+    @staticmethod
+    def _to_hits(search_result: list[models.ScoredPoint]) -> list[ISearchHit]:
+        return [
+            ISearchHit(id=hit.id, score=hit.score, payload=hit.payload)
+            for hit in search_result
+        ]
+
+    async def _aretrieve(
+        self,
+        ids: list[int | str],
+        filter: models.Filter | None = None,
+        with_payload: models.PayloadSelector | bool = True,
+    ) -> list[models.Record]:
+        """
+        Points of `ids` that match `filter`, in any order.
+        """
+        if not ids:
+            return []
+        if self.local_index is not None:
+            return self.local_index.retrieve(ids, filter, with_payload)
+        if filter is None:
+            response = await self.async_http.points_api.get_points(
+                collection_name=self.collection_name,
+                point_request=models.PointRequest(
+                    ids=ids, with_payload=with_payload, with_vector=False
+                ),
+            )
+            return response.result
+        response = await self.async_http.points_api.scroll_points(
+            collection_name=self.collection_name,
+            scroll_request=models.ScrollRequest(
+                filter=models.Filter(
+                    must=[models.HasIdCondition(has_id=ids), *(filter.must or [])],
+                    must_not=filter.must_not,
+                ),
+                limit=len(ids),
+                with_payload=with_payload,
+                with_vector=False,
+            ),
+        )
+        return response.result.points
+
+    @staticmethod
+    def _unique_ids(
+        rankings: list[list[tuple[int | str, float]]]
+    ) -> list[int | str]:
+        return list(
+            dict.fromkeys(point_id for ranking in rankings for point_id, _ in ranking)
+        )
+
+    async def _alexical_search(
+        self, texts: list[str], user_id: str | UUID, params: ISearchParams
+    ) -> list[list[ISearchHit]]:
+        """
+        BM25 search, fused with the dense results by reciprocal rank in hybrid
+        mode. Lexical mode makes no embedding call, and no network call at all
+        with the local backend.
+        """
+        # A single read, the registry may swap the index after a reload
+        lexical_index = self.lexical_index
+        if lexical_index is None:
+            raise ValueError(f"{self.collection_name} has no lexical index")
+        top = params.offset + params.limit
+        # Over-fetch so filtering and fusion still fill the page
+        candidates = max(4 * top, 50)
+        qdrant_filter = self._qdrant_filter(params.filter)
+        lexical = [lexical_index.search(text, candidates) for text in texts]
+        if qdrant_filter is not None:
+            records = await self._aretrieve(
+                self._unique_ids(lexical), qdrant_filter, with_payload=False
+            )
+            allowed = {record.id for record in records}
+            lexical = [
+                [hit for hit in ranking if hit[0] in allowed] for ranking in lexical
+            ]
+
+        rankings = lexical
+        if params.mode == ISearchMode.hybrid:
+            vectors = await self.aget_embeddings(texts=texts, user_id=user_id)
+            search_requests = [
+                self._search_request(vector, params).copy(
+                    update={"limit": candidates, "offset": 0, "with_payload": False}
+                )
+                for vector in vectors
+            ]
+            dense = await self._asearch_batch_points(search_requests)
+            rankings = [
+                reciprocal_rank_fusion(
+                    [
+                        [hit.id for hit in dense_result],
+                        [point_id for point_id, _ in lexical_ranking],
+                    ]
+                )
+                for dense_result, lexical_ranking in zip(dense, lexical, strict=True)
+            ]
+
+        pages = [ranking[params.offset : top] for ranking in rankings]
+        records = {
+            record.id: record
+            for record in await self._aretrieve(
+                self._unique_ids(pages), with_payload=self._with_payload(params)
+            )
+        }
+        return [
+            [
+                ISearchHit(id=point_id, score=score, payload=records[point_id].payload)
+                for point_id, score in page
+                if point_id in records
+            ]
+            for page in pages
+        ]
+
+    async def asearch_batch(
+        self,
+        texts: list[str],
+        user_id: str | UUID = "001",
+        params: ISearchParams | None = None,
+    ) -> list[list[ISearchHit]]:
+        """
+        Searches many texts with one embedding call and one Qdrant batch
+        search, results keep the order of `texts`.
+        """
+        params = params or ISearchParams()
+        if params.mode != ISearchMode.dense:
+            return await self._alexical_search(texts, user_id, params)
+        vectors = await self.aget_embeddings(texts=texts, user_id=user_id)
+        search_requests = [self._search_request(vector, params) for vector in vectors]
+        search_results = await self._asearch_batch_points(search_requests)
+        return [self._to_hits(result) for result in search_results]
+
+    async def asimilar(
+        self,
+        point_ids: list[int | str],
+        params: ISearchParams | None = None,
+    ) -> list[ISearchHit]:
+        """
+        Points similar to already stored ones (the mean of their vectors) with
+        Qdrant's recommend API or the local index, no embedding is needed.
+        Raises KeyError when a point does not exist.
+        """
+        params = params or ISearchParams()
+        recommend_request = models.RecommendRequest(
+            positive=point_ids,
+            negative=[],
+            filter=self._qdrant_filter(params.filter),
+            params=self._search_params(params),
+            limit=params.limit,
+            offset=params.offset,
+            with_payload=self._with_payload(params),
+            with_vector=False,
+            score_threshold=params.score_threshold,
+        )
+        if self.local_index is not None:
+            return self._to_hits(self.local_index.recommend(recommend_request))
+        try:
+            response = await self.async_http.points_api.recommend_points(
+                collection_name=self.collection_name,
+                recommend_request=recommend_request,
+            )
+        except UnexpectedResponse as e:
+            if e.status_code == 404:
+                raise KeyError(f"No point with id in {point_ids}") from e
+            raise
+        return self._to_hits(response.result)
+
+    async def asearch_by_vector(
+        self, vector: list[float], limit: int = 5, with_vector: bool = False
+    ) -> list[models.ScoredPoint]:
+        """
+        Dense search of an already embedded query, optionally returning the
+        stored vectors of the hits (e.g. for MMR re-ranking).
+        """
+        search_request = self._vector_search_request(vector, limit, with_vector)
+        return await self._asearch_points(search_request)
+
+    def search_by_vector(
+        self, vector: list[float], limit: int = 5, with_vector: bool = False
+    ) -> list[models.ScoredPoint]:
+        search_request = self._vector_search_request(vector, limit, with_vector)
+        return self._search_points(search_request)
+
+    async def asearch(
+        self,
+        text: str,
+        user_id: str | UUID = "001",
+        params: ISearchParams | None = None,
+    ) -> list[ISearchHit]:
+        params = params or ISearchParams()
+        if params.mode != ISearchMode.dense:
+            return (await self._alexical_search([text], user_id, params))[0]
+        # Convert text query into vector without blocking the event loop
+        vector = await self.aget_embedding(text=text, user_id=user_id)
+        search_request = self._search_request(vector, params)
+        search_result = await self._asearch_points(search_request)
+        return self._to_hits(search_result)
+
+    def search(
+        self,
+        text: str,
+        user_id: str | UUID = "001",
+        params: ISearchParams | None = None,
+    ) -> list[ISearchHit]:
+        # Dense only, the lexical and hybrid modes are async only
+        # Convert text query into vector
+        vector = self.get_embedding(text=text, user_id=user_id)
+        search_request = self._search_request(vector, params or ISearchParams())
+        # `search_result` contains found vector ids with similarity scores
+        # along with the stored payload
+        search_result = self._search_points(search_request)
+        return self._to_hits(search_result)
+
+    async def close(self) -> None:
+        if self._async_http is not None:
+            # AsyncApiClient has no close of its own
+            await self._async_http.client._async_client.aclose()
+            self._async_http = None
+        if self._async_grpc_channel is not None:
+            await self._async_grpc_channel.close()
+            self._async_grpc_channel = None
+            self._async_grpc_points = None
+        # QdrantClient.close is only available in recent qdrant-client releases
+        close = getattr(self.qdrant_client, "close", None)
+        if close is not None:
+            close()
+
+
+class NeuralSearcherRegistry:
+    """
+    Long lived NeuralSearcher per collection, so the Qdrant HTTP connections
+    are pooled and reused across requests instead of opened per search.
+
+    With `local_index_dir`, collections that have a snapshot in
+    `{local_index_dir}/{collection_name}` are searched in process. BM25
+    snapshots in `{lexical_index_dir}/{collection_name}` enable the lexical
+    and hybrid search modes.
+
+    `init_db` rewrites the snapshots from another process, so every
+    `reload_interval` seconds `get` compares their mtimes and swaps both
+    indexes of the searcher when they changed. A snapshot that fails to
+    load (e.g. half written) keeps the previous index until the next check.
+    """
+
+    def __init__(
+        self,
+        local_index_dir: str | None = None,
+        lexical_index_dir: str | None = None,
+        reload_interval: float = 5.0,
+        **searcher_kwargs: Any,
+    ):
+        self.local_index_dir = local_index_dir
+        self.lexical_index_dir = lexical_index_dir
+        self.reload_interval = reload_interval
+        self.searcher_kwargs = searcher_kwargs
+        self._searchers: dict[str, NeuralSearcher] = {}
+        self._snapshot_versions: dict[str, tuple[int | None, ...]] = {}
+        self._checked_at: dict[str, float] = {}
+
+    def _load_local_index(self, collection_name: str) -> LocalVectorIndex | None:
+        if self.local_index_dir is None:
+            return None
+        path = os.path.join(self.local_index_dir, collection_name)
+        try:
+            return LocalVectorIndex.load(path)
+        except Exception as e:
+            # Fall back to Qdrant, e.g. before init_db wrote the snapshot
+            logging.error(f"Error loading local vector index {path}: {e}")
+            return None
+
+    def _load_lexical_index(self, collection_name: str) -> BM25Index | None:
+        if self.lexical_index_dir is None:
+            return None
+        path = os.path.join(self.lexical_index_dir, collection_name)
+        try:
+            return BM25Index.load(path)
+        except Exception as e:
+            logging.error(f"Error loading lexical index {path}: {e}")
+            return None
+
+    def _snapshot_version(self, collection_name: str) -> tuple[int | None, ...]:
+        files = []
+        if self.local_index_dir is not None:
+            path = os.path.join(self.local_index_dir, collection_name)
+            files += [
+                os.path.join(path, LocalVectorIndex.VECTORS_FILE),
+                os.path.join(path, LocalVectorIndex.POINTS_FILE),
+            ]
+        if self.lexical_index_dir is not None:
+            path = os.path.join(self.lexical_index_dir, collection_name)
+            files += [
+                os.path.join(path, BM25Index.ARRAYS_FILE),
+                os.path.join(path, BM25Index.META_FILE),
+            ]
+        version = []
+        for file in files:
+            try:
+                version.append(os.stat(file).st_mtime_ns)
+            except OSError:
+                version.append(None)
+        return tuple(version)
+
+    def _reload_if_changed(self, searcher: NeuralSearcher) -> None:
+        collection_name = searcher.collection_name
+        now = time.monotonic()
+        if now - self._checked_at.get(collection_name, 0.0) < self.reload_interval:
+            return
+        self._checked_at[collection_name] = now
+        version = self._snapshot_version(collection_name)
+        if version == self._snapshot_versions.get(collection_name):
+            return
+        local_index = self._load_local_index(collection_name)
+        lexical_index = self._load_lexical_index(collection_name)
+        if (local_index is None and searcher.local_index is not None) or (
+            lexical_index is None and searcher.lexical_index is not None
+        ):
+            # Retry in the next check, the new snapshot may still be written
+            return
+        searcher.local_index = local_index
+        searcher.lexical_index = lexical_index
+        self._snapshot_versions[collection_name] = version
+
+    def get(self, collection_name: str) -> NeuralSearcher:
+        searcher = self._searchers.get(collection_name)
+        if searcher is None:
+            version = self._snapshot_version(collection_name)
+            searcher = NeuralSearcher(
+                collection_name,
+                local_index=self._load_local_index(collection_name),
+                lexical_index=self._load_lexical_index(collection_name),
+                **self.searcher_kwargs,
+            )
+            self._searchers[collection_name] = searcher
+            self._snapshot_versions[collection_name] = version
+            self._checked_at[collection_name] = time.monotonic()
+        else:
+            self._reload_if_changed(searcher)
+        return searcher
+
+    async def close(self) -> None:
+        for searcher in self._searchers.values():
+            await searcher.close()
+        self._searchers.clear()
+        self._snapshot_versions.clear()
+        self._checked_at.clear()
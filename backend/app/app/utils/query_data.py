@@ -1,4 +1,5 @@
 """Create a ConversationalRetrievalChain for question/answering."""
+from asyncer import asyncify
 from langchain.callbacks.base import AsyncCallbackManager
 from langchain.callbacks.tracers import LangChainTracer
 from langchain.chains import ConversationalRetrievalChain
@@ -9,18 +10,28 @@ from langchain.chains.question_answering import load_qa_chain
 from langchain.chat_models import ChatOpenAI
 from langchain.vectorstores.base import VectorStore, VectorStoreRetriever
 
-from langchain.schema import Document
+from langchain.schema import BaseRetriever, Document
 from typing import List
 
 async def aget_relevant_documents(self, query: str) -> List[Document]:
-    return self.get_relevant_documents(query)
+    # The sync embedding cache, OpenAI and Qdrant calls block, keep them off
+    # the event loop so one chat question does not stall the whole worker
+    return await asyncify(self.get_relevant_documents)(query)
 
 VectorStoreRetriever.aget_relevant_documents = aget_relevant_documents
 
 def get_chain(
-    vectorstore: VectorStore, question_handler, stream_handler, tracing: bool = False
+    vectorstore: VectorStore,
+    question_handler,
+    stream_handler,
+    tracing: bool = False,
+    retriever: BaseRetriever | None = None,
 ) -> ConversationalRetrievalChain:
-    """Create a ConversationalRetrievalChain for question/answering."""
+    """Create a ConversationalRetrievalChain for question/answering.
+
+    `retriever` replaces the plain top-k `vectorstore.as_retriever()`, e.g.
+    with an `MMRRetriever`.
+    """
     # Construct a ConversationalRetrievalChain with a streaming llm for combine docs
     # and a separate, non-streaming llm for question generation
     manager = AsyncCallbackManager([])
@@ -53,7 +64,7 @@ def get_chain(
     )
 
     qa = ConversationalRetrievalChain(
-        retriever=vectorstore.as_retriever(),
+        retriever=retriever or vectorstore.as_retriever(),
         combine_docs_chain=doc_chain,
         question_generator=question_generator,
         callback_manager=manager,
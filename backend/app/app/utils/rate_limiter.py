@@ -0,0 +1,251 @@
+import asyncio
+import logging
+import time
+from contextlib import suppress
+from dataclasses import dataclass
+from fastapi import Request, Response, WebSocket
+from fastapi_limiter import FastAPILimiter
+from app.core.config import settings
+
+# Adds the hits counted locally to each window counter and returns the new
+# totals with their remaining TTL, for one or many keys in a single call.
+# ARGV holds a (hits, window in ms) pair per key.
+SYNC_HITS_SCRIPT = """
+local results = {}
+for i, key in ipairs(KEYS) do
+    local hits = tonumber(ARGV[2 * i - 1])
+    local window = tonumber(ARGV[2 * i])
+    local current = redis.call('INCRBY', key, hits)
+    local ttl = redis.call('PTTL', key)
+    if ttl < 0 then
+        redis.call('PEXPIRE', key, window)
+        ttl = window
+    end
+    results[i] = {current, ttl}
+end
+return results
+"""
+
+
+@dataclass
+class _Window:
+    window_ms: int
+    reset_at: float
+    # Hits of every worker in Redis as of the last sync
+    global_count: int = 0
+    # Local hits being sent to Redis / not sent yet
+    in_flight: int = 0
+    pending: int = 0
+    synced: bool = False
+    synced_at: float = 0.0
+
+    @property
+    def known_count(self) -> int:
+        return self.global_count + self.in_flight + self.pending
+
+
+class HybridRateLimitStore:
+    """
+    Keeps the rate limit windows of each identity in process and reconciles
+    them with the Redis counters in batches.
+
+    A hit is decided locally while the last Redis count is fresh (younger
+    than `sync_interval`), fewer than `batch_size` local hits are unsent and,
+    once the `workers` could cross the limit with their unsent batches, each
+    of them holds at most `overshoot // workers` unconfirmed hits. The first
+    hit of a window in a worker and any hit over those bounds go to Redis
+    right away, so workers together exceed a limit by `overshoot` hits at
+    most. The rest is flushed every `sync_interval` seconds in one script
+    call.
+    """
+
+    def __init__(
+        self,
+        sync_interval: float = 1.0,
+        batch_size: int = 20,
+        overshoot: int = 10,
+        workers: int = 1,
+    ):
+        self.sync_interval = sync_interval
+        self.batch_size = batch_size
+        self.overshoot = overshoot
+        self.workers = max(workers, 1)
+        # Unconfirmed local hits a worker may hold near the limit
+        self.local_budget = overshoot // self.workers
+        self.local_decisions = 0
+        self.remote_decisions = 0
+        self.rejections = 0
+        self.syncs = 0
+        self._windows: dict[str, _Window] = {}
+        self._flush_task: asyncio.Task | None = None
+
+    async def _sync(self, keys: list[str]) -> None:
+        windows = [(key, self._windows[key]) for key in keys]
+        hits = []
+        args = []
+        for _, window in windows:
+            hits.append(window.pending)
+            args.extend([window.pending, window.window_ms])
+            window.in_flight += window.pending
+            window.pending = 0
+        sync_hits = FastAPILimiter.redis.register_script(SYNC_HITS_SCRIPT)
+        try:
+            results = await sync_hits(keys=keys, args=args)
+        except Exception:
+            # Keep the hits to send them in the next flush
+            for (_, window), count in zip(windows, hits, strict=True):
+                window.in_flight -= count
+                window.pending += count
+            raise
+        self.syncs += 1
+        now = time.monotonic()
+        for (_, window), count, (current, ttl) in zip(
+            windows, hits, results, strict=True
+        ):
+            window.in_flight -= count
+            window.global_count = max(window.global_count, int(current))
+            window.reset_at = now + int(ttl) / 1000
+            window.synced = True
+            window.synced_at = now
+
+    async def hit(self, key: str, times: int, window_ms: int) -> int:
+        """
+        Counts a hit for `key`. Returns 0 when it is allowed, otherwise the
+        milliseconds left until the window resets.
+        """
+        now = time.monotonic()
+        window = self._windows.get(key)
+        if window is None or now >= window.reset_at:
+            window = _Window(window_ms=window_ms, reset_at=now + window_ms / 1000)
+            self._windows[key] = window
+        if window.known_count >= times:
+            self.local_decisions += 1
+            self.rejections += 1
+            return max(int((window.reset_at - now) * 1000), 1)
+
+        window.pending += 1
+        near_limit = window.known_count > times - self.workers * self.batch_size
+        if (
+            not window.synced
+            or window.pending >= self.batch_size
+            or now - window.synced_at >= self.sync_interval
+            or (near_limit and window.pending + window.in_flight > self.local_budget)
+        ):
+            self.remote_decisions += 1
+            try:
+                await self._sync([key])
+            except Exception as e:
+                # Fail open, the hit is sent again in the next flush
+                logging.error(f"Error syncing rate limits: {e}")
+                return 0
+            if window.global_count > times:
+                self.rejections += 1
+                return max(int((window.reset_at - time.monotonic()) * 1000), 1)
+            return 0
+        self.local_decisions += 1
+        return 0
+
+    async def flush(self) -> None:
+        now = time.monotonic()
+        for key in [
+            key
+            for key, window in self._windows.items()
+            if window.reset_at <= now and not window.pending and not window.in_flight
+        ]:
+            del self._windows[key]
+        keys = [key for key, window in self._windows.items() if window.pending]
+        for i in range(0, len(keys), 500):
+            await self._sync(keys[i : i + 500])
+
+    async def _flush_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logging.error(f"Error syncing rate limits: {e}")
+
+    async def start(self) -> None:
+        self._flush_task = asyncio.create_task(self._flush_periodically())
+
+    async def stop(self) -> None:
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._flush_task
+            self._flush_task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            logging.error(f"Error syncing rate limits: {e}")
+
+    def stats(self) -> dict[str, int | float]:
+        decisions = self.local_decisions + self.remote_decisions
+        return {
+            "local_decisions": self.local_decisions,
+            "remote_decisions": self.remote_decisions,
+            "local_ratio": self.local_decisions / decisions if decisions else 0.0,
+            "rejections": self.rejections,
+            "syncs": self.syncs,
+            "windows": len(self._windows),
+        }
+
+
+rate_limit_store = HybridRateLimitStore(
+    sync_interval=settings.RATE_LIMIT_SYNC_INTERVAL,
+    batch_size=settings.RATE_LIMIT_BATCH_SIZE,
+    overshoot=settings.RATE_LIMIT_OVERSHOOT,
+    workers=settings.WEB_CONCURRENCY,
+)
+
+
+class HybridRateLimiter:
+    """
+    Drop-in replacement of `fastapi_limiter.depends.RateLimiter` whose
+    decisions are mostly taken in process by `rate_limit_store`.
+    """
+
+    def __init__(
+        self,
+        times: int = 1,
+        milliseconds: int = 0,
+        seconds: int = 0,
+        minutes: int = 0,
+        hours: int = 0,
+        store: HybridRateLimitStore = rate_limit_store,
+    ):
+        self.times = times
+        self.window_ms = (
+            milliseconds + 1000 * seconds + 60000 * minutes + 3600000 * hours
+        )
+        self.store = store
+
+    async def __call__(self, request: Request, response: Response):
+        if not FastAPILimiter.redis:
+            raise Exception("You must call FastAPILimiter.init in startup event of fastapi!")
+        rate_key = await FastAPILimiter.identifier(request)
+        key = (
+            f"{FastAPILimiter.prefix}:hybrid:{rate_key}:{request.method}:"
+            f"{request.url.path}:{self.times}:{self.window_ms}"
+        )
+        pexpire = await self.store.hit(key, self.times, self.window_ms)
+        if pexpire:
+            return await FastAPILimiter.http_callback(request, response, pexpire)
+
+
+class HybridWebSocketRateLimiter(HybridRateLimiter):
+    """
+    Drop-in replacement of `fastapi_limiter.depends.WebSocketRateLimiter`.
+    """
+
+    async def __call__(self, ws: WebSocket, context_key: str = ""):
+        if not FastAPILimiter.redis:
+            raise Exception("You must call FastAPILimiter.init in startup event of fastapi!")
+        rate_key = await FastAPILimiter.identifier(ws)
+        key = (
+            f"{FastAPILimiter.prefix}:hybrid:ws:{rate_key}:{context_key}:"
+            f"{self.times}:{self.window_ms}"
+        )
+        pexpire = await self.store.hit(key, self.times, self.window_ms)
+        if pexpire:
+            return await FastAPILimiter.ws_callback(ws, pexpire)
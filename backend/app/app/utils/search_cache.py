@@ -0,0 +1,103 @@
+import hashlib
+import json
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+from app.core.config import settings
+from app.db.redis import RedisPool, redis_pool
+
+
+class SearchResultCache:
+    """
+    Shared cache of vector search results keyed by collection plus the query
+    parameters (text, top-k, filter...).
+
+    Every collection has a version counter that ingestion bumps with
+    `bump_version`. Entries store the version they were computed for and are
+    ignored once it changes, so reloading a collection never serves stale
+    points. The version and the entry are read in a single pipelined round
+    trip.
+    """
+
+    def __init__(self, pool: RedisPool, ttl: int = 60 * 60, prefix: str = "search"):
+        self.pool = pool
+        self.ttl = ttl
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        # Time the hits would have spent embedding and searching
+        self.saved_ms = 0.0
+
+    def _version_key(self, collection_name: str) -> str:
+        return f"{self.prefix}:{collection_name}:version"
+
+    def _key(self, collection_name: str, query: dict[str, Any]) -> str:
+        raw = json.dumps(query, sort_keys=True, default=str)
+        digest = hashlib.sha256(raw.encode("utf-8")).hexdigest()
+        return f"{self.prefix}:{collection_name}:{digest}"
+
+    async def bump_version(self, collection_name: str) -> int:
+        return await self.pool.get_client().incr(self._version_key(collection_name))
+
+    async def get_or_search(
+        self,
+        collection_name: str,
+        query: dict[str, Any],
+        search: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        """
+        Returns the cached result of `query`, or awaits `search` and caches
+        its (JSON serializable) result for the current collection version.
+        """
+        started_at = time.perf_counter()
+        redis_client = self.pool.get_client()
+        key = self._key(collection_name, query)
+        version = None
+        try:
+            async with redis_client.pipeline(transaction=False) as pipe:
+                pipe.get(self._version_key(collection_name))
+                pipe.get(key)
+                version, raw = await pipe.execute()
+            version = version or "0"
+            if raw is not None:
+                entry = json.loads(raw)
+                if entry["version"] == version:
+                    lookup_ms = (time.perf_counter() - started_at) * 1000
+                    self.hits += 1
+                    self.saved_ms += max(entry["cost_ms"] - lookup_ms, 0.0)
+                    return entry["result"]
+                self.stale += 1
+        except Exception as e:
+            logging.error(f"Error reading search cache: {e}")
+        self.misses += 1
+
+        searched_at = time.perf_counter()
+        result = await search()
+        if version is None:
+            return result
+        entry = {
+            "version": version,
+            "cost_ms": (time.perf_counter() - searched_at) * 1000,
+            "result": result,
+        }
+        try:
+            await redis_client.set(key, json.dumps(entry, default=str), ex=self.ttl)
+        except Exception as e:
+            logging.error(f"Error writing search cache: {e}")
+        return result
+
+    def cache_info(self) -> dict[str, int | float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "saved_ms": round(self.saved_ms, 3),
+            "avg_saved_ms": round(self.saved_ms / self.hits, 3) if self.hits else 0.0,
+        }
+
+
+search_cache = SearchResultCache(pool=redis_pool, ttl=settings.SEARCH_CACHE_TTL)
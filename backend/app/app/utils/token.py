@@ -1,9 +1,24 @@
-from datetime import timedelta
+from collections.abc import Iterable, Sequence
 from uuid import UUID
 from redis.asyncio import Redis
 from app.models.user_model import User
 from app.schemas.common_schema import TokenType
 
+# Adds the token and sets the TTL only when the set is created, in one atomic
+# server-side call instead of SMEMBERS + SADD + EXPIRE round trips
+ADD_TOKEN_SCRIPT = """
+local is_new_set = redis.call('SCARD', KEYS[1]) == 0
+redis.call('SADD', KEYS[1], ARGV[1])
+if is_new_set and tonumber(ARGV[2]) > 0 then
+    redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+return 1
+"""
+
+
+def get_token_key(user_id: UUID | str, token_type: TokenType) -> str:
+    return f"user:{user_id}:{token_type}"
+
 
 async def add_token_to_redis(
     redis_client: Redis,
@@ -12,21 +27,71 @@ async def add_token_to_redis(
     token_type: TokenType,
     expire_time: int | None = None,
 ):
-    token_key = f"user:{user.id}:{token_type}"
-    valid_tokens = await get_valid_tokens(redis_client, user.id, token_type)
-    await redis_client.sadd(token_key, token)
-    if not valid_tokens:
-        await redis_client.expire(token_key, timedelta(minutes=expire_time))
+    token_key = get_token_key(user.id, token_type)
+    expire_seconds = expire_time * 60 if expire_time else 0
+    add_token = redis_client.register_script(ADD_TOKEN_SCRIPT)
+    await add_token(keys=[token_key], args=[token, expire_seconds])
 
 
 async def get_valid_tokens(redis_client: Redis, user_id: UUID, token_type: TokenType):
-    token_key = f"user:{user_id}:{token_type}"
+    token_key = get_token_key(user_id, token_type)
     valid_tokens = await redis_client.smembers(token_key)
     return valid_tokens
 
 
+async def is_token_valid(
+    redis_client: Redis, user_id: UUID, token: str, token_type: TokenType
+) -> bool:
+    token_key = get_token_key(user_id, token_type)
+    return bool(await redis_client.sismember(token_key, token))
+
+
 async def delete_tokens(redis_client: Redis, user: User, token_type: TokenType):
-    token_key = f"user:{user.id}:{token_type}"
-    valid_tokens = await redis_client.smembers(token_key)
-    if valid_tokens is not None:
-        await redis_client.delete(token_key)
+    token_key = get_token_key(user.id, token_type)
+    await redis_client.delete(token_key)
+
+
+
+async def get_valid_tokens_for_users(
+    redis_client: Redis, user_ids: Sequence[UUID], token_type: TokenType
+) -> dict[UUID, set[str]]:
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for user_id in user_ids:
+            pipe.smembers(get_token_key(user_id, token_type))
+        results = await pipe.execute()
+    return dict(zip(user_ids, results, strict=True))
+
+
+async def validate_tokens(
+    redis_client: Redis,
+    user_tokens: Sequence[tuple[UUID, str]],
+    token_type: TokenType,
+) -> list[bool]:
+    """
+    Checks many (user_id, token) pairs in a single round trip, results keep
+    the order of `user_tokens`.
+    """
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for user_id, token in user_tokens:
+            pipe.sismember(get_token_key(user_id, token_type), token)
+        results = await pipe.execute()
+    return [bool(result) for result in results]
+
+
+async def delete_tokens_for_users(
+    redis_client: Redis,
+    user_ids: Sequence[UUID],
+    token_types: Iterable[TokenType] = tuple(TokenType),
+) -> int:
+    """
+    Revokes the tokens of many users (logout storms, admin deactivations)
+    with a single DEL, returns how many token sets were deleted.
+    """
+    token_keys = [
+        get_token_key(user_id, token_type)
+        for user_id in user_ids
+        for token_type in token_types
+    ]
+    if not token_keys:
+        return 0
+    return await redis_client.delete(*token_keys)
@@ -0,0 +1,311 @@
+import json
+import os
+from typing import Any
+import numpy as np
+from qdrant_client.http import models
+
+# Payload values are matched per kind in homogeneous arrays, so 1 never
+# matches True or "1", float is the kind of range conditions
+VALUE_DTYPES: dict[type, type] = {
+    bool: np.bool_,
+    int: np.int64,
+    str: np.str_,
+    float: np.float64,
+}
+
+
+def is_value_of_kind(value: Any, kind: type) -> bool:
+    if kind is bool:
+        return isinstance(value, bool)
+    if isinstance(value, bool):
+        return False
+    if kind is float:
+        return isinstance(value, (int, float))
+    return isinstance(value, kind)
+
+
+class LocalVectorIndex:
+    """
+    In process, exact cosine search over a small collection, answering the
+    same `SearchRequest`s as Qdrant with the same `ScoredPoint` results.
+
+    Vectors are stored L2-normalized in one contiguous float32 matrix, so a
+    search is a matrix product plus an argpartition. Snapshots are a
+    `vectors.npy` file (memory-mapped on load, the page cache is shared by
+    all workers) and a `points.json` file with the ids and payloads.
+    """
+
+    VECTORS_FILE = "vectors.npy"
+    POINTS_FILE = "points.json"
+
+    def __init__(
+        self,
+        ids: list[int | str],
+        vectors: np.ndarray,
+        payloads: list[dict[str, Any]],
+    ):
+        if len(ids) != len(vectors) or len(ids) != len(payloads):
+            raise ValueError("ids, vectors and payloads must have the same length")
+        self.ids = ids
+        self.vectors = vectors
+        self.payloads = payloads
+        self._columns: dict[tuple[str, type], tuple[np.ndarray, np.ndarray]] = {}
+        self._indexes = {point_id: index for index, point_id in enumerate(ids)}
+
+    @staticmethod
+    def normalize(vectors: np.ndarray) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+    @classmethod
+    def save(
+        cls,
+        path: str,
+        ids: list[int | str],
+        vectors: list[list[float]] | np.ndarray,
+        payloads: list[dict[str, Any]],
+    ) -> None:
+        os.makedirs(path, exist_ok=True)
+        np.save(
+            os.path.join(path, cls.VECTORS_FILE),
+            np.ascontiguousarray(cls.normalize(vectors)),
+        )
+        with open(os.path.join(path, cls.POINTS_FILE), "w") as f:
+            json.dump({"ids": ids, "payloads": payloads}, f, default=str)
+
+    @classmethod
+    def load(cls, path: str) -> "LocalVectorIndex":
+        vectors = np.load(os.path.join(path, cls.VECTORS_FILE), mmap_mode="r")
+        with open(os.path.join(path, cls.POINTS_FILE)) as f:
+            points = json.load(f)
+        return cls(ids=points["ids"], vectors=vectors, payloads=points["payloads"])
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _column(self, key: str, kind: type) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Point indexes and values of the `kind` values of `key`, the values in
+        a homogeneous array. Array payloads give one entry per element, as
+        Qdrant matches any element of an array.
+        """
+        column = self._columns.get((key, kind))
+        if column is None:
+            indexes = []
+            values = []
+            for index, payload in enumerate(self.payloads):
+                value = payload.get(key) if payload else None
+                for item in value if isinstance(value, list) else [value]:
+                    if is_value_of_kind(item, kind):
+                        indexes.append(index)
+                        values.append(item)
+            column = (
+                np.array(indexes, dtype=np.int64),
+                np.array(values, dtype=VALUE_DTYPES[kind]),
+            )
+            self._columns[(key, kind)] = column
+        return column
+
+    def _match_mask(self, key: str, values: list[bool | int | str]) -> np.ndarray:
+        mask = np.zeros(len(self), dtype=bool)
+        if not values:
+            return mask
+        kind = next(
+            (kind for kind in VALUE_DTYPES if is_value_of_kind(values[0], kind)), None
+        )
+        if kind is None:
+            raise ValueError(f"Unsupported match value on {key}: {values[0]!r}")
+        indexes, column = self._column(key, kind)
+        matches = np.isin(column, np.array(values, dtype=VALUE_DTYPES[kind]))
+        mask[indexes[matches]] = True
+        return mask
+
+    def _condition_mask(self, condition: models.FieldCondition) -> np.ndarray:
+        if isinstance(condition.match, models.MatchValue):
+            return self._match_mask(condition.key, [condition.match.value])
+        if isinstance(condition.match, models.MatchAny):
+            return self._match_mask(condition.key, condition.match.any)
+        if condition.range is not None:
+            indexes, numbers = self._column(condition.key, float)
+            selected = np.ones(len(numbers), dtype=bool)
+            bounds = condition.range
+            if bounds.gt is not None:
+                selected &= numbers > bounds.gt
+            if bounds.gte is not None:
+                selected &= numbers >= bounds.gte
+            if bounds.lt is not None:
+                selected &= numbers < bounds.lt
+            if bounds.lte is not None:
+                selected &= numbers <= bounds.lte
+            mask = np.zeros(len(self), dtype=bool)
+            mask[indexes[selected]] = True
+            return mask
+        raise ValueError(f"Unsupported filter condition on {condition.key}")
+
+    def _filter_mask(self, filter: models.Filter | None) -> np.ndarray | None:
+        if filter is None:
+            return None
+        mask = np.ones(len(self), dtype=bool)
+        for condition in filter.must or []:
+            mask &= self._condition_mask(condition)
+        for condition in filter.must_not or []:
+            mask &= ~self._condition_mask(condition)
+        return mask
+
+    @staticmethod
+    def _project(
+        payload: dict[str, Any] | None,
+        with_payload: bool | list[str] | models.PayloadSelector | None,
+    ) -> dict[str, Any] | None:
+        if payload is None or not with_payload:
+            return None
+        if with_payload is True:
+            return payload
+        if isinstance(with_payload, models.PayloadSelectorInclude):
+            return {key: payload[key] for key in with_payload.include if key in payload}
+        if isinstance(with_payload, models.PayloadSelectorExclude):
+            return {
+                key: value
+                for key, value in payload.items()
+                if key not in with_payload.exclude
+            }
+        return {key: payload[key] for key in with_payload if key in payload}
+
+    def top_k(
+        self,
+        scores: np.ndarray,
+        limit: int,
+        offset: int = 0,
+        mask: np.ndarray | None = None,
+        score_threshold: float | None = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Indexes and scores of the best `limit` points after `offset`, in
+        descending score order.
+        """
+        scores = scores.astype(np.float32, copy=True)
+        if mask is not None:
+            scores[~mask] = -np.inf
+        if score_threshold is not None:
+            scores[scores < score_threshold] = -np.inf
+        k = min(limit + offset, len(scores))
+        if k == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        candidates = np.argpartition(-scores, k - 1)[:k]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+        candidates = candidates[offset:]
+        candidates = candidates[np.isfinite(scores[candidates])]
+        return candidates, scores[candidates]
+
+    def _scored_points(
+        self,
+        indexes: np.ndarray,
+        scores: np.ndarray,
+        with_payload: bool | list[str] | models.PayloadSelector | None,
+        with_vector: bool = False,
+    ) -> list[models.ScoredPoint]:
+        # Normalized vectors, Qdrant also returns them normalized for cosine
+        return [
+            models.ScoredPoint(
+                id=self.ids[index],
+                version=0,
+                score=float(score),
+                payload=self._project(self.payloads[index], with_payload),
+                vector=self.vectors[index].tolist() if with_vector else None,
+            )
+            for index, score in zip(indexes, scores, strict=True)
+        ]
+
+    def retrieve(
+        self,
+        ids: list[int | str],
+        filter: models.Filter | None = None,
+        with_payload: bool | list[str] | models.PayloadSelector | None = True,
+    ) -> list[models.Record]:
+        """
+        Points of `ids` that exist and match `filter`, in the order of `ids`.
+        """
+        indexes = [
+            self._indexes[point_id] for point_id in ids if point_id in self._indexes
+        ]
+        mask = self._filter_mask(filter)
+        if mask is not None:
+            indexes = [index for index in indexes if mask[index]]
+        return [
+            models.Record(
+                id=self.ids[index],
+                payload=self._project(self.payloads[index], with_payload),
+                vector=None,
+            )
+            for index in indexes
+        ]
+
+    def search_batch(
+        self, search_requests: list[models.SearchRequest]
+    ) -> list[list[models.ScoredPoint]]:
+        if not search_requests:
+            return []
+        queries = self.normalize(
+            np.array([request.vector for request in search_requests], dtype=np.float32)
+        )
+        # One matrix product scores every query against every point
+        all_scores = queries @ self.vectors.T
+        results = []
+        for request, scores in zip(search_requests, all_scores, strict=True):
+            indexes, top_scores = self.top_k(
+                scores,
+                limit=request.limit,
+                offset=request.offset or 0,
+                mask=self._filter_mask(request.filter),
+                score_threshold=request.score_threshold,
+            )
+            results.append(
+                self._scored_points(
+                    indexes,
+                    top_scores,
+                    request.with_payload,
+                    with_vector=bool(request.with_vector),
+                )
+            )
+        return results
+
+    def search(self, search_request: models.SearchRequest) -> list[models.ScoredPoint]:
+        return self.search_batch([search_request])[0]
+
+    def recommend(
+        self, recommend_request: models.RecommendRequest
+    ) -> list[models.ScoredPoint]:
+        """
+        Points similar to the stored vectors of `positive` (and unlike the
+        ones of `negative`), like Qdrant's average vector recommendation.
+        The example points are never returned.
+        """
+        examples = []
+        for point_ids in (recommend_request.positive, recommend_request.negative or []):
+            try:
+                examples.append([self._indexes[point_id] for point_id in point_ids])
+            except KeyError as e:
+                raise KeyError(f"No point with id {e.args[0]}")
+        positive, negative = examples
+        query = self.vectors[positive].mean(axis=0)
+        if negative:
+            query = query + (query - self.vectors[negative].mean(axis=0))
+        scores = self.vectors @ self.normalize(query)
+        mask = self._filter_mask(recommend_request.filter)
+        if mask is None:
+            mask = np.ones(len(self), dtype=bool)
+        mask[positive + negative] = False
+        indexes, top_scores = self.top_k(
+            scores,
+            limit=recommend_request.limit,
+            offset=recommend_request.offset or 0,
+            mask=mask,
+            score_threshold=recommend_request.score_threshold,
+        )
+        return self._scored_points(
+            indexes,
+            top_scores,
+            recommend_request.with_payload,
+            with_vector=bool(recommend_request.with_vector),
+        )
@@ -0,0 +1,132 @@
+import base64
+import io
+from typing import Literal
+import msgpack
+import numpy as np
+import orjson
+from fastapi import HTTPException, Response, status
+
+JSON_MEDIA_TYPE = "application/json"
+NPY_MEDIA_TYPE = "application/x-npy"
+OCTET_STREAM_MEDIA_TYPE = "application/octet-stream"
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+VECTOR_MEDIA_TYPES = (
+    JSON_MEDIA_TYPE,
+    NPY_MEDIA_TYPE,
+    OCTET_STREAM_MEDIA_TYPE,
+    *MSGPACK_MEDIA_TYPES,
+)
+
+# OpenAPI description of the binary alternatives to the JSON envelope
+VECTOR_RESPONSES = {
+    200: {
+        "content": {
+            NPY_MEDIA_TYPE: {},
+            OCTET_STREAM_MEDIA_TYPE: {},
+            MSGPACK_MEDIA_TYPES[0]: {},
+        },
+        "description": "JSON envelope, `.npy` matrix, raw little endian float32 "
+        "matrix (shape in `X-Vector-Shape`) or MessagePack envelope, "
+        "picked by the `Accept` header.",
+    }
+}
+
+
+def negotiate_media_type(accept: str | None, supported: tuple[str, ...]) -> str | None:
+    """
+    First of `supported` that the `Accept` header allows, honoring q values
+    and wildcards. A missing header means the first supported type.
+    """
+    if not accept:
+        return supported[0]
+    ranges: list[tuple[float, str]] = []
+    for part in accept.split(","):
+        media_range, *params = [item.strip() for item in part.split(";")]
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if media_range and quality > 0:
+            ranges.append((quality, media_range.lower()))
+    # Stable sort keeps the client's order among equal q values
+    for _, media_range in sorted(ranges, key=lambda item: item[0], reverse=True):
+        if media_range == "*/*":
+            return supported[0]
+        if media_range.endswith("/*"):
+            prefix = media_range[:-1]
+            for media_type in supported:
+                if media_type.startswith(prefix):
+                    return media_type
+        elif media_range in supported:
+            return media_range
+    return None
+
+
+def vector_media_type(accept: str | None) -> str:
+    """
+    Media type to send vectors as, negotiated before any work is done so an
+    unsupported `Accept` costs no embedding call.
+    """
+    media_type = negotiate_media_type(accept, VECTOR_MEDIA_TYPES)
+    if media_type is None:
+        raise HTTPException(
+            status_code=status.HTTP_406_NOT_ACCEPTABLE,
+            detail=f"Vectors can be returned as {', '.join(VECTOR_MEDIA_TYPES)}",
+        )
+    return media_type
+
+
+def vectors_response(
+    vectors: list[list[float]] | np.ndarray,
+    media_type: str = JSON_MEDIA_TYPE,
+    encoding_format: Literal["float", "base64"] = "float",
+    message: str = "",
+    meta: dict | None = None,
+) -> Response:
+    """
+    Serializes a matrix of vectors as `media_type` (see `vector_media_type`).
+
+    JSON keeps the usual `{data, message, meta}` envelope, with float32 lists
+    or, for `encoding_format="base64"`, one base64 string of little endian
+    float32 bytes per vector (about 4x smaller). `.npy` and octet-stream send
+    the bare matrix, MessagePack sends the envelope with raw float32 bytes
+    per vector. A `Response` is returned so the route's response model does
+    not validate the floats one by one.
+    """
+    matrix = np.asarray(vectors, dtype="<f4")
+    if matrix.ndim != 2:
+        matrix = matrix.reshape(len(matrix), -1 if len(matrix) else 0)
+    meta = meta or {}
+    if media_type == NPY_MEDIA_TYPE:
+        buffer = io.BytesIO()
+        np.save(buffer, matrix, allow_pickle=False)
+        return Response(content=buffer.getvalue(), media_type=media_type)
+    if media_type == OCTET_STREAM_MEDIA_TYPE:
+        return Response(
+            content=matrix.tobytes(),
+            media_type=media_type,
+            headers={"X-Vector-Shape": ",".join(str(n) for n in matrix.shape)},
+        )
+    if media_type in MSGPACK_MEDIA_TYPES:
+        content = msgpack.packb(
+            {
+                "data": [vector.tobytes() for vector in matrix],
+                "message": message,
+                "meta": meta,
+            }
+        )
+        return Response(content=content, media_type=media_type)
+
+    if encoding_format == "base64":
+        data = [base64.b64encode(vector.tobytes()).decode() for vector in matrix]
+    else:
+        data = matrix
+    content = orjson.dumps(
+        {"data": data, "message": message, "meta": meta},
+        option=orjson.OPT_SERIALIZE_NUMPY,
+    )
+    return Response(content=content, media_type=JSON_MEDIA_TYPE)
@@ -0,0 +1,146 @@
+"""
+Memory and search latency of the Qdrant collection profiles.
+
+Creates one throwaway collection per profile of app/db/collection_profiles.py
+with the same random vectors, then measures search latency, recall@k against
+exact search and the estimated resident memory of the vectors and the HNSW
+graph. Collections are deleted afterwards.
+
+Usage (from backend/app, with the app environment loaded):
+
+    python -m benchmarks.collection_profiles --points 20000 --queries 200
+"""
+import argparse
+import statistics
+import time
+import numpy as np
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+from app.core.config import settings
+from app.db.collection_profiles import COLLECTION_PROFILES, CollectionProfile
+
+
+def make_vectors(points: int, size: int, seed: int = 0) -> np.ndarray:
+    # Clustered like real embeddings, uniform noise makes every profile look good
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(points // 100, 1), size))
+    vectors = centers[rng.integers(0, len(centers), points)]
+    vectors += rng.normal(scale=0.3, size=(points, size))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(
+        np.float32
+    )
+
+
+def wait_until_indexed(client: QdrantClient, collection_name: str) -> None:
+    status = client.get_collection(collection_name).status
+    while status != models.CollectionStatus.GREEN:
+        time.sleep(0.5)
+        status = client.get_collection(collection_name).status
+
+
+def run_profile(
+    client: QdrantClient,
+    profile: CollectionProfile,
+    vectors: np.ndarray,
+    queries: np.ndarray,
+    limit: int,
+) -> dict:
+    collection_name = f"benchmark_{profile.name}"
+    client.recreate_collection(
+        collection_name=collection_name,
+        **profile.recreate_collection_kwargs(size=vectors.shape[1]),
+    )
+    try:
+        start = time.perf_counter()
+        client.upload_collection(
+            collection_name=collection_name,
+            vectors=vectors,
+            payload=[{"n": i} for i in range(len(vectors))],
+            ids=list(range(len(vectors))),
+            batch_size=256,
+        )
+        wait_until_indexed(client, collection_name)
+        indexing_s = time.perf_counter() - start
+
+        latencies_ms = []
+        recalls = []
+        for query in queries:
+            exact = client.search(
+                collection_name=collection_name,
+                query_vector=query.tolist(),
+                search_params=models.SearchParams(exact=True),
+                limit=limit,
+                with_payload=False,
+            )
+            start = time.perf_counter()
+            hits = client.search(
+                collection_name=collection_name,
+                query_vector=query.tolist(),
+                search_params=models.SearchParams(
+                    quantization=models.QuantizationSearchParams(
+                        rescore=profile.rescore
+                    )
+                    if profile.rescore is not None
+                    else None
+                ),
+                limit=limit,
+                with_payload=False,
+            )
+            latencies_ms.append((time.perf_counter() - start) * 1000)
+            expected = {hit.id for hit in exact}
+            recalls.append(len(expected & {hit.id for hit in hits}) / len(expected))
+    finally:
+        client.delete_collection(collection_name)
+
+    latencies_ms.sort()
+    p99_index = min(len(latencies_ms) - 1, int(len(latencies_ms) * 0.99))
+    return {
+        "profile": profile.name,
+        "ram_mb": profile.estimated_ram_bytes(*vectors.shape) / 2**20,
+        "indexing_s": indexing_s,
+        "p50_ms": statistics.median(latencies_ms),
+        "p99_ms": latencies_ms[p99_index],
+        "recall": statistics.mean(recalls),
+    }
+
+
+def main(points: int, size: int, queries: int, limit: int, profiles: list[str]) -> None:
+    client = QdrantClient(
+        url=settings.QDRANT_CLOUD_URL, api_key=settings.QDRANT_CLOUD_API_KEY
+    )
+    vectors = make_vectors(points, size)
+    query_vectors = make_vectors(queries, size, seed=1)
+    print(
+        f"{'profile':<10}{'RAM MB':>10}{'index s':>10}{'p50 ms':>10}{'p99 ms':>10}"
+        f"{'recall@' + str(limit):>12}"
+    )
+    for name in profiles:
+        try:
+            result = run_profile(
+                client, COLLECTION_PROFILES[name], vectors, query_vectors, limit
+            )
+        except ValueError as e:
+            # e.g. product quantization on an older Qdrant
+            print(f"{name:<10}skipped: {e}")
+            continue
+        print(
+            f"{result['profile']:<10}{result['ram_mb']:>10.1f}"
+            f"{result['indexing_s']:>10.1f}{result['p50_ms']:>10.2f}"
+            f"{result['p99_ms']:>10.2f}{result['recall']:>12.3f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--points", type=int, default=20_000)
+    parser.add_argument("--size", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument(
+        "--profiles",
+        nargs="+",
+        default=list(COLLECTION_PROFILES),
+        choices=list(COLLECTION_PROFILES),
+    )
+    args = parser.parse_args()
+    main(args.points, args.size, args.queries, args.limit, args.profiles)
@@ -0,0 +1,82 @@
+"""
+Event loop latency while bcrypt runs for many concurrent logins.
+
+Compares calling `verify_password` directly on the event loop with the
+process pool backed `averify_password`. A probe task wakes up every
+`--interval` ms and records how late it was, which is the delay every other
+coroutine (e.g. websocket streams) sees in the same worker.
+
+Usage (from backend/app, with the app environment loaded):
+
+    python -m benchmarks.password_hashing --logins 32
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from app.core.security import (
+    averify_password,
+    get_password_hash,
+    password_hash_pool,
+    verify_password,
+)
+
+
+async def probe_event_loop(interval: float, lags: list[float], stop: asyncio.Event):
+    while not stop.is_set():
+        expected = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        lags.append(max(time.perf_counter() - expected, 0.0))
+
+
+async def run_logins(mode: str, logins: int, hashed: str, interval: float) -> dict:
+    async def inline_login() -> bool:
+        return verify_password("secret-password", hashed)
+
+    async def pooled_login() -> bool:
+        return await averify_password("secret-password", hashed)
+
+    login = inline_login if mode == "inline" else pooled_login
+    lags: list[float] = []
+    stop = asyncio.Event()
+    probe = asyncio.create_task(probe_event_loop(interval, lags, stop))
+    await asyncio.sleep(interval * 2)
+    start = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await probe
+    lags_ms = sorted(lag * 1000 for lag in lags) or [0.0]
+    return {
+        "mode": mode,
+        "logins": logins,
+        "total_s": elapsed,
+        "lag_p50_ms": statistics.median(lags_ms),
+        "lag_p99_ms": lags_ms[min(len(lags_ms) - 1, int(len(lags_ms) * 0.99))],
+        "lag_max_ms": lags_ms[-1],
+    }
+
+
+async def main(logins: int, interval_ms: float) -> None:
+    hashed = get_password_hash("secret-password")
+    # Warm up the pool so process start up is not measured
+    await averify_password("secret-password", hashed)
+    interval = interval_ms / 1000
+    print(f"{'mode':<8}{'logins':>8}{'total s':>10}{'lag p50':>10}{'lag p99':>10}{'lag max':>10}")
+    for mode in ("inline", "pool"):
+        result = await run_logins(mode, logins, hashed, interval)
+        print(
+            f"{result['mode']:<8}{result['logins']:>8}{result['total_s']:>10.2f}"
+            f"{result['lag_p50_ms']:>10.1f}{result['lag_p99_ms']:>10.1f}"
+            f"{result['lag_max_ms']:>10.1f}"
+        )
+    print("pool stats:", password_hash_pool.stats())
+    password_hash_pool.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--logins", type=int, default=32)
+    parser.add_argument("--interval", type=float, default=5.0, help="probe period in ms")
+    args = parser.parse_args()
+    asyncio.run(main(args.logins, args.interval))
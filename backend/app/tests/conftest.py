@@ -0,0 +1,34 @@
+import os
+
+# Settings are read from the environment when app.core.config is imported,
+# these placeholders let the app modules load without a .env file
+TEST_SETTINGS = {
+    "PROJECT_NAME": "test",
+    "DATABASE_USER": "postgres",
+    "DATABASE_PASSWORD": "postgres",
+    "DATABASE_HOST": "localhost",
+    "DATABASE_PORT": "5432",
+    "DATABASE_NAME": "test_db",
+    "REDIS_HOST": "localhost",
+    "REDIS_PORT": "6379",
+    "QDRANT_HOST": "localhost",
+    "QDRANT_CLOUD_URL": "http://localhost:6333",
+    "QDRANT_CLOUD_API_KEY": "test",
+    "SUPERTOKENS_CORE_URI": "http://localhost:3567",
+    "SUPERTOKENS_CORE_API_KEY": "test",
+    "COGNITO_URL": "http://localhost",
+    "COGNITO_POOL_ID": "test",
+    "COGNITO_CLIENT_ID": "test",
+    "COGNITO_CLIENT_SECRET": "test",
+    "COGNITO_REGION": "us-east-1",
+    "AWS_SECRET_ACCESS_KEY": "test",
+    "AWS_ACCESS_KEY_ID": "test",
+    "FIRST_SUPERUSER_EMAIL": "admin@example.com",
+    "FIRST_SUPERUSER_PASSWORD": "admin",
+    "OPENAI_API_KEY": "sk-test",
+    "ENCRYPT_KEY": "TshgGacKPYam35m79UqbRg46JAbUm2yYtxOCQFdqa3w=",
+    "BACKEND_CORS_ORIGINS": '["*"]',
+}
+
+for name, value in TEST_SETTINGS.items():
+    os.environ.setdefault(name, value)
@@ -0,0 +1,65 @@
+import pytest
+from pydantic import ValidationError
+from qdrant_client.http import models
+from app.core.config import Settings
+from app.db.collection_profiles import (
+    COLLECTION_PROFILES,
+    CollectionProfile,
+    get_collection_profile,
+)
+
+
+def test_full_profile_is_the_original_setup():
+    kwargs = get_collection_profile("full").recreate_collection_kwargs(size=1536)
+    assert kwargs == {
+        "vectors_config": models.VectorParams(
+            size=1536, distance=models.Distance.COSINE
+        ),
+        "on_disk_payload": False,
+    }
+
+
+def test_scalar_profile_quantizes_and_keeps_originals_on_disk():
+    kwargs = get_collection_profile("scalar").recreate_collection_kwargs(size=1536)
+    scalar = kwargs["quantization_config"].scalar
+    assert scalar.type == models.ScalarType.INT8
+    assert scalar.always_ram is True
+    assert kwargs["on_disk_payload"] is True
+    assert kwargs["optimizers_config"].memmap_threshold == 20_000
+    assert kwargs["hnsw_config"] == models.HnswConfigDiff(m=16, ef_construct=100)
+
+
+def test_product_profile_is_rejected_without_client_support(monkeypatch):
+    # The pinned qdrant-client 1.1.5 has no product quantization
+    monkeypatch.delattr(models, "ProductQuantization", raising=False)
+    assert not COLLECTION_PROFILES["product"].supported
+    with pytest.raises(ValueError, match="qdrant-client >= 1.2"):
+        get_collection_profile("product")
+    with pytest.raises(ValidationError, match="qdrant-client >= 1.2"):
+        Settings(QDRANT_COLLECTION_PROFILE="product")
+
+
+def test_settings_validate_the_profile():
+    settings = Settings(QDRANT_COLLECTION_PROFILE="scalar")
+    assert settings.QDRANT_COLLECTION_PROFILE == "scalar"
+    with pytest.raises(ValidationError, match="Unknown collection profile"):
+        Settings(QDRANT_COLLECTION_PROFILE="missing")
+
+
+def test_estimated_ram_shrinks_with_quantization():
+    ram = {
+        name: profile.estimated_ram_bytes(points=100_000, size=1536)
+        for name, profile in COLLECTION_PROFILES.items()
+    }
+    assert ram["full"] > ram["scalar"] > ram["product"]
+    assert ram["on_disk"] < ram["full"]
+
+
+def test_estimated_ram_counts_vectors_and_graph():
+    profile = CollectionProfile(name="test", hnsw_m=8)
+    assert profile.estimated_ram_bytes(points=10, size=4) == 10 * 4 * 4 + 10 * 16 * 4
+
+
+def test_unknown_profile():
+    with pytest.raises(ValueError, match="Unknown collection profile"):
+        get_collection_profile("missing")
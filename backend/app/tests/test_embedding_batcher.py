@@ -0,0 +1,161 @@
+import asyncio
+import pytest
+from app.utils import embedding_batcher as batcher_module
+from app.utils.embedding_batcher import EmbeddingBatcher
+
+
+class WordEncoding:
+    def encode(self, text, disallowed_special=()):
+        return text.split()
+
+
+class FakeEmbeddings:
+    """
+    Stands in for openai.Embedding.acreate, the embedding of a text is its
+    length. Data comes back in reverse index order, like OpenAI may.
+    """
+
+    def __init__(self, fail: bool = False):
+        self.calls: list[list[str]] = []
+        self.fail = fail
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def acreate(self, input, model, api_key):
+        self.calls.append(list(input))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+            if self.fail:
+                raise RuntimeError("openai is down")
+            return {
+                "data": [
+                    {"index": index, "embedding": [float(len(text))]}
+                    for index, text in reversed(list(enumerate(input)))
+                ]
+            }
+        finally:
+            self.in_flight -= 1
+
+
+@pytest.fixture
+def fake_openai(monkeypatch) -> FakeEmbeddings:
+    fake = FakeEmbeddings()
+    monkeypatch.setattr(batcher_module.openai.Embedding, "acreate", fake.acreate)
+    return fake
+
+
+def make_batcher(**kwargs) -> EmbeddingBatcher:
+    batcher = EmbeddingBatcher(api_key="sk-test", **kwargs)
+    batcher._encoding = WordEncoding()
+    return batcher
+
+
+def test_concurrent_requests_share_one_call(fake_openai):
+    batcher = make_batcher(max_delay=0.01)
+
+    async def run():
+        return await asyncio.gather(
+            batcher.embed("a", "ada"),
+            batcher.embed("bbb", "ada"),
+            batcher.embed("a", "ada"),
+        )
+
+    assert asyncio.run(run()) == [[1.0], [3.0], [1.0]]
+    assert fake_openai.calls == [["a", "bbb"]]
+    stats = batcher.stats()
+    assert stats["batches"] == 1
+    assert stats["upstream_calls_saved"] == 2
+
+
+def test_batches_are_split_by_size_and_tokens(fake_openai):
+    batcher = make_batcher(max_delay=0.01, max_batch_size=2, max_batch_tokens=4)
+
+    async def run():
+        texts = ["a", "b", "c", "one two three", "four"]
+        return await batcher.embed_many(texts, "ada")
+
+    assert asyncio.run(run()) == [[1.0], [1.0], [1.0], [13.0], [4.0]]
+    assert fake_openai.calls == [["a", "b"], ["c", "one two three"], ["four"]]
+
+
+def test_models_are_batched_separately(fake_openai):
+    batcher = make_batcher(max_delay=0.01)
+
+    async def run():
+        await asyncio.gather(batcher.embed("a", "ada"), batcher.embed("b", "other"))
+
+    asyncio.run(run())
+    assert sorted(fake_openai.calls) == [["a"], ["b"]]
+
+
+def test_failures_reach_every_waiter(monkeypatch):
+    fake = FakeEmbeddings(fail=True)
+    monkeypatch.setattr(batcher_module.openai.Embedding, "acreate", fake.acreate)
+    batcher = make_batcher(max_delay=0.01)
+
+    async def run():
+        return await asyncio.gather(
+            batcher.embed("a", "ada"), batcher.embed("b", "ada"), return_exceptions=True
+        )
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert batcher.stats()["errors"] == 1
+
+
+def test_chunk_by_tokens():
+    batcher = make_batcher(max_batch_size=3)
+    texts = ["a b", "c", "d e f g", "h", "i", "j", "k"]
+    assert batcher.chunk_by_tokens(texts, max_tokens=3) == [
+        ["a b", "c"],
+        ["d e f g"],
+        ["h", "i", "j"],
+        ["k"],
+    ]
+
+
+def test_embed_chunked_dedups_and_keeps_order(fake_openai):
+    batcher = make_batcher(max_concurrency=2)
+    texts = ["a b", "c", "a b", "d e f g", "hh", "i j k", "c"]
+
+    embeddings = asyncio.run(batcher.embed_chunked(texts, "ada", max_chunk_tokens=4))
+
+    assert embeddings == [[float(len(text))] for text in texts]
+    assert fake_openai.calls == [["a b", "c"], ["d e f g"], ["hh", "i j k"]]
+    assert fake_openai.max_in_flight == 2
+
+
+def test_token_count_falls_back_when_encoding_cannot_load(monkeypatch):
+    def unreachable(name):
+        raise ConnectionError("no network")
+
+    monkeypatch.setattr(batcher_module.tiktoken, "get_encoding", unreachable)
+    batcher = EmbeddingBatcher(api_key="sk-test")
+
+    async def run():
+        await batcher.start()
+        await batcher._encoding_task
+        tokens = batcher.count_tokens("x" * 30)
+        await batcher.stop()
+        return tokens
+
+    assert asyncio.run(run()) == 11
+    assert batcher._encoding is None
+
+
+def test_sync_callers_in_worker_threads_join_the_batches(fake_openai):
+    batcher = make_batcher(max_delay=0.05)
+
+    async def run():
+        await batcher.start()
+        results = await asyncio.gather(
+            asyncio.to_thread(batcher.embed_sync, "aa", "ada"),
+            asyncio.to_thread(batcher.embed_sync, "bbbb", "ada"),
+        )
+        await batcher.stop()
+        return results
+
+    assert asyncio.run(run()) == [[2.0], [4.0]]
+    assert fake_openai.calls == [["aa", "bbbb"]]
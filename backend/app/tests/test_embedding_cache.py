@@ -0,0 +1,127 @@
+import asyncio
+import threading
+import numpy as np
+from langchain.schema import Document
+from langchain.vectorstores.base import VectorStore, VectorStoreRetriever
+from app.utils.embedding_cache import EmbeddingCache, normalize_text
+import app.utils.query_data  # noqa: F401, patches VectorStoreRetriever
+
+
+class FakeRedis:
+    def __init__(self, fail: bool = False):
+        self.data: dict[str, bytes] = {}
+        self.fail = fail
+
+    def get(self, key):
+        if self.fail:
+            raise ConnectionError("redis is down")
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        if self.fail:
+            raise ConnectionError("redis is down")
+        self.data[key] = value
+
+
+class FakeAsyncRedis:
+    def __init__(self, redis: FakeRedis):
+        self.redis = redis
+
+    async def get(self, key):
+        return self.redis.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.redis.set(key, value, ex=ex)
+
+
+class FakePool:
+    def __init__(self, fail: bool = False):
+        self.redis = FakeRedis(fail)
+
+    def get_sync_binary_client(self):
+        return self.redis
+
+    def get_binary_client(self):
+        return FakeAsyncRedis(self.redis)
+
+
+def test_normalize_text_collapses_whitespace():
+    assert normalize_text("  what is\n\tGDPR  ") == "what is GDPR"
+
+
+def test_equal_normalized_texts_share_an_entry():
+    cache = EmbeddingCache(FakePool())
+    cache.set("ada", "what is GDPR", [0.5, 0.25])
+    assert cache.get("ada", "what  is\nGDPR") == [0.5, 0.25]
+    assert cache.get("other-model", "what is GDPR") is None
+
+
+def test_local_tier_is_an_lru():
+    pool = FakePool()
+    cache = EmbeddingCache(pool, max_size=2)
+    cache.set("ada", "a", [1.0])
+    cache.set("ada", "b", [2.0])
+    cache.get("ada", "a")
+    cache.set("ada", "c", [3.0])
+    assert list(cache._local) == [cache._key("ada", "a"), cache._key("ada", "c")]
+    # Evicted locally, still shared through Redis
+    assert cache.get("ada", "b") == [2.0]
+    assert cache.cache_info()["redis_hits"] == 1
+
+
+def test_redis_stores_float32_bytes():
+    pool = FakePool()
+    cache = EmbeddingCache(pool)
+    cache.set("ada", "a", [0.1, 0.2, 0.3])
+    (raw,) = pool.redis.data.values()
+    assert len(raw) == 3 * 4
+    other_worker = EmbeddingCache(pool)
+    np.testing.assert_allclose(other_worker.get("ada", "a"), [0.1, 0.2, 0.3], rtol=1e-6)
+
+
+def test_redis_errors_fail_open():
+    cache = EmbeddingCache(FakePool(fail=True))
+    cache.set("ada", "a", [1.0])
+    assert cache.get("ada", "a") == [1.0]
+    assert cache.get("ada", "b") is None
+    assert cache.cache_info()["misses"] == 1
+
+
+def test_async_methods_share_the_tiers():
+    pool = FakePool()
+
+    async def run():
+        cache = EmbeddingCache(pool)
+        await cache.aset("ada", "a", [1.0, 2.0])
+        return await EmbeddingCache(pool).aget("ada", "a")
+
+    assert asyncio.run(run()) == [1.0, 2.0]
+
+
+class ThreadRecordingStore(VectorStore):
+    def __init__(self):
+        self.thread_ids: list[int] = []
+
+    def add_texts(self, texts, metadatas=None, **kwargs):
+        return []
+
+    def similarity_search(self, query, k=4, **kwargs):
+        self.thread_ids.append(threading.get_ident())
+        return [Document(page_content=query)]
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, **kwargs):
+        return cls()
+
+
+def test_chat_retrieval_runs_off_the_event_loop():
+    store = ThreadRecordingStore()
+    retriever = VectorStoreRetriever(vectorstore=store)
+
+    async def run():
+        documents = await retriever.aget_relevant_documents("question")
+        return documents, threading.get_ident()
+
+    documents, loop_thread_id = asyncio.run(run())
+    assert documents[0].page_content == "question"
+    assert store.thread_ids and store.thread_ids[0] != loop_thread_id
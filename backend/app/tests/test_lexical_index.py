@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+from app.utils.lexical_index import BM25Index, reciprocal_rank_fusion, tokenize
+
+TEXTS = [
+    "Article 5.2 of the GDPR sets the accountability principle",
+    "The GDPR applies to personal data, GDPR fines can be high",
+    "Tax returns are due in April",
+    None,
+    "Regulation 2016/679 is the GDPR",
+]
+IDS = [1, 2, 3, 4, "five"]
+
+
+@pytest.fixture
+def index() -> BM25Index:
+    return BM25Index.build(IDS, TEXTS)
+
+
+def test_tokenize_keeps_article_numbers_whole():
+    assert tokenize("Article 5.2 and Regulation 2016/679, 1983-A") == [
+        "article",
+        "5.2",
+        "and",
+        "regulation",
+        "2016/679",
+        "1983-a",
+    ]
+    assert tokenize(None) == []
+
+
+def test_search_ranks_by_bm25(index):
+    results = index.search("GDPR fines", limit=10)
+    assert [point_id for point_id, _ in results] == [2, "five", 1]
+    scores = [score for _, score in results]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_search_never_returns_documents_without_query_terms(index):
+    assert index.search("tax", limit=10) == [(3, pytest.approx(index.scores("tax")[2]))]
+    assert index.search("unknown words", limit=10) == []
+
+
+def test_search_limit(index):
+    assert len(index.search("gdpr", limit=2)) == 2
+
+
+def test_exact_token_lookup(index):
+    assert [point_id for point_id, _ in index.search("2016/679", limit=5)] == ["five"]
+
+
+def test_snapshot_round_trip(tmp_path, index):
+    index.save(str(tmp_path))
+    loaded = BM25Index.load(str(tmp_path))
+    assert loaded.ids == IDS
+    np.testing.assert_allclose(loaded.scores("gdpr"), index.scores("gdpr"))
+
+
+def test_reciprocal_rank_fusion():
+    fused = reciprocal_rank_fusion([[1, 2, 3], [3, 1]], k=60)
+    assert [point_id for point_id, _ in fused] == [1, 3, 2]
+    assert fused[0][1] == pytest.approx(1 / 61 + 1 / 62)
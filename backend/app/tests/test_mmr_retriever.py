@@ -0,0 +1,102 @@
+import asyncio
+import numpy as np
+import pytest
+from qdrant_client.http import models
+from app.utils.mmr_retriever import (
+    MMRRetriever,
+    SimilarityRetriever,
+    maximal_marginal_relevance,
+)
+
+QUERY = np.array([1.0, 0.0, 0.0])
+CANDIDATES = np.array(
+    [
+        [1.0, 0.1, 0.0],  # most relevant
+        [1.0, 0.1, 0.001],  # near duplicate of 0
+        [0.8, 0.0, 0.6],  # relevant, different direction
+        [0.0, 1.0, 0.0],  # unrelated
+    ]
+)
+
+
+def test_first_pick_is_the_most_relevant():
+    assert maximal_marginal_relevance(QUERY, CANDIDATES, k=1) == [0]
+
+
+def test_near_duplicates_are_dropped():
+    assert maximal_marginal_relevance(QUERY, CANDIDATES, k=4) == [0, 2, 3]
+
+
+def test_without_duplicate_threshold_pure_relevance_keeps_duplicates():
+    picks = maximal_marginal_relevance(
+        QUERY, CANDIDATES, k=2, lambda_mult=1.0, duplicate_threshold=None
+    )
+    assert picks == [0, 1]
+
+
+def test_diversity_beats_relevance_with_low_lambda():
+    picks = maximal_marginal_relevance(
+        QUERY, CANDIDATES, k=2, lambda_mult=0.1, duplicate_threshold=None
+    )
+    assert picks == [0, 3]
+
+
+def test_empty_candidates():
+    assert maximal_marginal_relevance(QUERY, np.empty((0, 3)), k=4) == []
+
+
+class FakeSearcher:
+    def __init__(self):
+        self.limits = []
+
+    def _points(self, limit):
+        self.limits.append(limit)
+        return [
+            models.ScoredPoint(
+                id=index,
+                version=0,
+                score=1.0,
+                payload={"page_content": f"chunk {index}", "metadata": {"n": index}},
+                vector=vector.tolist(),
+            )
+            for index, vector in enumerate(CANDIDATES)
+        ]
+
+    def get_embedding(self, text, user_id):
+        return QUERY.tolist()
+
+    async def aget_embedding(self, text, user_id):
+        return QUERY.tolist()
+
+    def search_by_vector(self, vector, limit, with_vector=False):
+        return self._points(limit)[:limit]
+
+    async def asearch_by_vector(self, vector, limit, with_vector=False):
+        return self._points(limit)[:limit]
+
+
+def test_retriever_returns_diverse_documents():
+    searcher = FakeSearcher()
+    retriever = MMRRetriever(searcher, k=2, fetch_k=150)
+    documents = retriever.get_relevant_documents("question")
+    async_documents = asyncio.run(retriever.aget_relevant_documents("question"))
+    assert [document.page_content for document in documents] == ["chunk 0", "chunk 2"]
+    assert async_documents == documents
+    # Internal searches are not bound by the API's limit of 100
+    assert searcher.limits == [150, 150]
+
+
+@pytest.mark.parametrize("k,fetch_k", [(0, 20), (5, 4)])
+def test_retriever_rejects_invalid_sizes(k, fetch_k):
+    with pytest.raises(ValueError):
+        MMRRetriever(FakeSearcher(), k=k, fetch_k=fetch_k)
+
+
+def test_similarity_retriever_keeps_the_search_order():
+    searcher = FakeSearcher()
+    retriever = SimilarityRetriever(searcher, k=2)
+    documents = retriever.get_relevant_documents("question")
+    async_documents = asyncio.run(retriever.aget_relevant_documents("question"))
+    assert [document.page_content for document in documents] == ["chunk 0", "chunk 1"]
+    assert [document.metadata for document in async_documents] == [{"n": 0}, {"n": 1}]
+    assert searcher.limits == [2, 2]
@@ -0,0 +1,197 @@
+import asyncio
+import os
+import warnings
+from grpc import aio as grpc_aio
+from qdrant_client import grpc
+from qdrant_client.http import models
+from app.schemas.search_schema import ISearchMode, ISearchParams
+from app.utils.lexical_index import BM25Index
+from app.utils.neural_searcher import NeuralSearcher, NeuralSearcherRegistry
+from app.utils.vector_index import LocalVectorIndex
+
+
+class PointsServicer(grpc.PointsServicer):
+    def __init__(self):
+        self.requests = []
+        self.metadata = []
+
+    async def Search(self, request, context):
+        self.requests.append(request)
+        self.metadata.append(dict(context.invocation_metadata()))
+        return grpc.SearchResponse(
+            result=[
+                grpc.ScoredPoint(id=grpc.PointId(num=7), score=0.75, version=1),
+                grpc.ScoredPoint(id=grpc.PointId(num=3), score=0.5, version=1),
+            ]
+        )
+
+    async def SearchBatch(self, request, context):
+        self.requests.append(request)
+        return grpc.SearchBatchResponse(
+            result=[
+                grpc.BatchResult(
+                    result=[grpc.ScoredPoint(id=grpc.PointId(num=i), score=1.0)]
+                )
+                for i, _ in enumerate(request.search_points)
+            ]
+        )
+
+
+def make_searcher(grpc_port: int) -> NeuralSearcher:
+    with warnings.catch_warnings():
+        # Api key over plain http, fine against the local test server
+        warnings.simplefilter("ignore")
+        return NeuralSearcher(
+            "docs",
+            openai_api_key="sk-test",
+            host=None,
+            is_cloud_qdrant=True,
+            url="http://127.0.0.1:6333",
+            api_key="secret",
+            prefer_grpc=True,
+            grpc_port=grpc_port,
+            timeout=5,
+        )
+
+
+def search_request(limit: int = 2) -> models.SearchRequest:
+    return models.SearchRequest(vector=[0.1, 0.2, 0.3], limit=limit, with_payload=True)
+
+
+def test_async_search_uses_grpc_aio_channel():
+    async def run():
+        servicer = PointsServicer()
+        server = grpc_aio.server()
+        grpc.add_PointsServicer_to_server(servicer, server)
+        port = server.add_insecure_port("127.0.0.1:0")
+        await server.start()
+        searcher = make_searcher(port)
+        try:
+            hits = await searcher._asearch_points(search_request())
+            batches = await searcher._asearch_batch_points(
+                [search_request(), search_request(limit=5)]
+            )
+        finally:
+            await searcher.close()
+            await server.stop(None)
+        return servicer, hits, batches
+
+    servicer, hits, batches = asyncio.run(run())
+    assert [hit.id for hit in hits] == [7, 3]
+    assert [hit.score for hit in hits] == [0.75, 0.5]
+    assert [[hit.id for hit in batch] for batch in batches] == [[0], [1]]
+    search, search_batch = servicer.requests
+    assert search.collection_name == "docs"
+    assert search.limit == 2
+    assert [points.limit for points in search_batch.search_points] == [2, 5]
+    assert servicer.metadata[0]["api-key"] == "secret"
+
+
+def test_close_after_async_clients_were_opened():
+    async def run():
+        searcher = make_searcher(6334)
+        http_client = searcher.async_http.client._async_client
+        searcher.async_grpc_points
+        await searcher.close()
+        await searcher.close()
+        return searcher, http_client
+
+    searcher, http_client = asyncio.run(run())
+    assert http_client.is_closed
+    assert searcher._async_http is None
+    assert searcher._async_grpc_channel is None
+
+
+def test_async_rest_client_matches_sync_client():
+    searcher = make_searcher(6334)
+    remote = searcher.qdrant_client._client
+    http_client = searcher.async_http.client._async_client
+    assert searcher.async_http.client.host == remote.rest_uri
+    assert http_client.headers["api-key"] == "secret"
+    assert remote._rest_args["http2"] is True
+    assert http_client._transport._pool._http2 is True
+
+
+def save_local_index(path, ids, mtime_ns):
+    LocalVectorIndex.save(path, ids, [[1.0, 0.0]] * len(ids), [{}] * len(ids))
+    for file in (LocalVectorIndex.VECTORS_FILE, LocalVectorIndex.POINTS_FILE):
+        os.utime(os.path.join(path, file), ns=(mtime_ns, mtime_ns))
+
+
+def save_lexical_index(path, ids, texts, mtime_ns):
+    BM25Index.build(ids, texts).save(path)
+    for file in (BM25Index.ARRAYS_FILE, BM25Index.META_FILE):
+        os.utime(os.path.join(path, file), ns=(mtime_ns, mtime_ns))
+
+
+def make_registry(tmp_path, reload_interval=0.0) -> NeuralSearcherRegistry:
+    return NeuralSearcherRegistry(
+        local_index_dir=str(tmp_path),
+        lexical_index_dir=str(tmp_path),
+        reload_interval=reload_interval,
+        openai_api_key="sk-test",
+        host="localhost",
+    )
+
+
+def test_registry_reloads_rewritten_local_snapshots(tmp_path):
+    path = str(tmp_path / "docs")
+    save_local_index(path, [1, 2], mtime_ns=1_000_000_000)
+    registry = make_registry(tmp_path)
+    searcher = registry.get("docs")
+    assert searcher.local_index.ids == [1, 2]
+
+    # init_db re-ingests from another process
+    save_local_index(path, [1, 2, 3], mtime_ns=2_000_000_000)
+    assert registry.get("docs") is searcher
+    assert searcher.local_index.ids == [1, 2, 3]
+
+
+def test_registry_keeps_the_index_while_a_snapshot_is_broken(tmp_path):
+    path = str(tmp_path / "docs")
+    save_local_index(path, [1, 2], mtime_ns=1_000_000_000)
+    registry = make_registry(tmp_path)
+    searcher = registry.get("docs")
+
+    points = os.path.join(path, LocalVectorIndex.POINTS_FILE)
+    with open(points, "w") as f:
+        f.write('{"ids": [1, 2, 3')
+    assert registry.get("docs").local_index.ids == [1, 2]
+
+    save_local_index(path, [4, 5], mtime_ns=3_000_000_000)
+    assert searcher.local_index.ids == [1, 2]
+    assert registry.get("docs").local_index.ids == [4, 5]
+
+
+def test_registry_checks_snapshots_once_per_interval(tmp_path):
+    path = str(tmp_path / "docs")
+    save_local_index(path, [1], mtime_ns=1_000_000_000)
+    registry = make_registry(tmp_path, reload_interval=60)
+    searcher = registry.get("docs")
+    save_local_index(path, [1, 2], mtime_ns=2_000_000_000)
+    assert registry.get("docs").local_index.ids == [1]
+
+    registry._checked_at["docs"] -= 60
+    assert registry.get("docs").local_index.ids == [1, 2]
+    asyncio.run(registry.close())
+    assert searcher is not registry.get("docs")
+
+
+def test_registry_reloads_the_lexical_index_with_the_local_one(tmp_path):
+    path = str(tmp_path / "docs")
+    save_local_index(path, [1, 2], mtime_ns=1_000_000_000)
+    save_lexical_index(path, [1, 2], ["gdpr fines", "tax"], mtime_ns=1_000_000_000)
+    registry = make_registry(tmp_path)
+    searcher = registry.get("docs")
+    params = ISearchParams(mode=ISearchMode.lexical, limit=5)
+
+    async def lexical_ids():
+        hits = await searcher.asearch("gdpr", user_id="user", params=params)
+        return [hit.id for hit in hits]
+
+    assert asyncio.run(lexical_ids()) == [1]
+
+    # Only the BM25 snapshot is rewritten
+    save_lexical_index(path, [1, 2], ["tax", "gdpr"], mtime_ns=2_000_000_000)
+    assert registry.get("docs") is searcher
+    assert asyncio.run(lexical_ids()) == [2]
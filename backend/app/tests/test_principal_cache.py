@@ -0,0 +1,137 @@
+import asyncio
+from uuid import uuid4
+import pytest
+from app.auth import principal_cache as principal_cache_module
+from app.auth.principal_cache import PrincipalCache
+from app.schemas.common_schema import IDecodedToken
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakePipeline:
+    def __init__(self, redis: "FakeRedis"):
+        self.redis = redis
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    def set(self, key, value, ex=None):
+        self.commands.append(lambda: self.redis.data.__setitem__(key, value))
+
+    def sadd(self, key, *values):
+        self.commands.append(
+            lambda: self.redis.data.setdefault(key, set()).update(values)
+        )
+
+    def expire(self, key, seconds):
+        pass
+
+    async def execute(self):
+        for command in self.commands:
+            command()
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def smembers(self, key):
+        return set(self.data.get(key, set()))
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+
+@pytest.fixture
+def clock(monkeypatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(principal_cache_module.time, "monotonic", clock)
+    return clock
+
+
+def decoded_token(email: str) -> IDecodedToken:
+    return IDecodedToken(user_id=uuid4(), username=email, email=email)
+
+
+def test_local_entries_expire_after_the_ttl(clock):
+    cache = PrincipalCache(local_ttl=10)
+    token = decoded_token("alice@example.com")
+
+    async def run():
+        await cache.set_decoded_token("alice", token)
+        clock.now += 9
+        fresh = await cache.get_decoded_token("alice")
+        clock.now += 2
+        expired = await cache.get_decoded_token("alice")
+        return fresh, expired
+
+    assert asyncio.run(run()) == (token, None)
+    assert cache.cache_info()["local_size"] == 0
+
+
+def test_local_tier_evicts_the_least_recently_used(clock):
+    cache = PrincipalCache(max_size=2)
+
+    async def run():
+        await cache.set_decoded_token("a", decoded_token("a@example.com"))
+        await cache.set_decoded_token("b", decoded_token("b@example.com"))
+        # A hit makes "a" the most recently used, so "b" is evicted
+        await cache.get_decoded_token("a")
+        await cache.set_decoded_token("c", decoded_token("c@example.com"))
+        return [await cache.get_decoded_token(sub) is not None for sub in "abc"]
+
+    assert asyncio.run(run()) == [True, False, True]
+    assert cache.cache_info()["local_size"] == 2
+
+
+def test_redis_tier_refills_the_local_tier(clock):
+    redis = FakeRedis()
+    cache = PrincipalCache(local_ttl=10)
+    cache.redis = redis
+    token = decoded_token("alice@example.com")
+
+    async def run():
+        await cache.set_decoded_token("alice", token)
+        clock.now += 11
+        from_redis = await cache.get_decoded_token("alice")
+        redis.data.clear()
+        from_local = await cache.get_decoded_token("alice")
+        return from_redis, from_local
+
+    assert asyncio.run(run()) == (token, token)
+    info = cache.cache_info()
+    assert (info["local_hits"], info["redis_hits"], info["misses"]) == (1, 1, 0)
+
+
+def test_invalidate_by_email_drops_every_tier(clock):
+    redis = FakeRedis()
+    cache = PrincipalCache()
+    cache.redis = redis
+
+    async def run():
+        await cache.set_decoded_token("alice", decoded_token("Alice@example.com"))
+        await cache.set_decoded_token("bob", decoded_token("bob@example.com"))
+        await cache.invalidate("ALICE@example.com")
+        return [
+            await cache.get_decoded_token(sub) is not None for sub in ("alice", "bob")
+        ]
+
+    assert asyncio.run(run()) == [False, True]
+    assert not any("alice" in key for key in redis.data)
@@ -0,0 +1,116 @@
+import asyncio
+import pytest
+from app.utils import rate_limiter
+from app.utils.rate_limiter import HybridRateLimitStore
+
+WINDOW_MS = 60_000
+
+
+class FakeLimiterRedis:
+    """
+    Runs SYNC_HITS_SCRIPT against a dict, counting the script calls.
+    """
+
+    def __init__(self):
+        self.counters: dict[str, int] = {}
+        self.calls: list[list[str]] = []
+        self.fail = False
+
+    def register_script(self, script):
+        assert script == rate_limiter.SYNC_HITS_SCRIPT
+
+        async def sync_hits(keys, args):
+            if self.fail:
+                raise ConnectionError("redis is down")
+            self.calls.append(list(keys))
+            results = []
+            for i, key in enumerate(keys):
+                self.counters[key] = self.counters.get(key, 0) + int(args[2 * i])
+                results.append([self.counters[key], args[2 * i + 1]])
+            return results
+
+        return sync_hits
+
+
+@pytest.fixture
+def redis(monkeypatch) -> FakeLimiterRedis:
+    fake = FakeLimiterRedis()
+    monkeypatch.setattr(rate_limiter.FastAPILimiter, "redis", fake)
+    return fake
+
+
+def hits(store, count, key="key", times=1000):
+    async def run():
+        return [await store.hit(key, times, WINDOW_MS) for _ in range(count)]
+
+    return asyncio.run(run())
+
+
+def test_hits_far_from_the_limit_are_batched(redis):
+    store = HybridRateLimitStore(sync_interval=60, batch_size=5, overshoot=2)
+    assert hits(store, 11) == [0] * 11
+    # First hit of the window, then one sync every batch_size hits
+    assert len(redis.calls) == 3
+    assert redis.counters["key"] == 11
+    assert store.stats()["local_decisions"] == 8
+
+
+def test_stale_counts_are_synced(redis):
+    store = HybridRateLimitStore(sync_interval=0, batch_size=5)
+    hits(store, 4)
+    assert len(redis.calls) == 4
+
+
+def test_limit_is_enforced_from_redis(redis):
+    store = HybridRateLimitStore(sync_interval=60, batch_size=5, overshoot=0)
+    results = hits(store, 12, times=10)
+    assert results[:10] == [0] * 10
+    assert all(result > 0 for result in results[10:])
+    assert redis.counters["key"] == 10
+    assert store.stats()["rejections"] == 2
+
+
+def test_workers_together_stay_within_the_overshoot(redis):
+    workers = 4
+    times = 100
+    stores = [
+        HybridRateLimitStore(
+            sync_interval=60, batch_size=20, overshoot=8, workers=workers
+        )
+        for _ in range(workers)
+    ]
+
+    async def run():
+        admitted = 0
+        for _ in range(2 * times):
+            for store in stores:
+                admitted += not await store.hit("key", times, WINDOW_MS)
+        return admitted
+
+    assert times <= asyncio.run(run()) <= times + 8
+
+
+def test_flush_sends_pending_hits_in_one_call(redis):
+    store = HybridRateLimitStore(sync_interval=60, batch_size=50)
+
+    async def run():
+        for key in ("a", "b", "c"):
+            for _ in range(3):
+                await store.hit(key, 1000, WINDOW_MS)
+        redis.calls.clear()
+        await store.flush()
+
+    asyncio.run(run())
+    assert redis.calls == [["a", "b", "c"]]
+    assert redis.counters == {"a": 3, "b": 3, "c": 3}
+
+
+def test_failed_sync_fails_open_and_keeps_the_hits(redis):
+    store = HybridRateLimitStore(sync_interval=60, batch_size=5)
+    redis.fail = True
+    assert hits(store, 2, times=10) == [0, 0]
+    redis.fail = False
+    asyncio.run(store.flush())
+    assert redis.counters["key"] == 2
+    window = store._windows["key"]
+    assert (window.pending, window.in_flight) == (0, 0)
@@ -0,0 +1,45 @@
+import asyncio
+from types import SimpleNamespace
+from app.api.v1.endpoints import qdrant
+from app.schemas.search_schema import ISearchHit, ISearchParams
+
+
+class FakeSearcher:
+    collection_name = "my_docs"
+    lexical_index = None
+
+    async def asearch(self, text, user_id, params):
+        return [
+            ISearchHit(id=1, score=0.9, payload={"page_content": "first"}),
+            ISearchHit(id=2, score=0.8, payload={"page_content": "second"}),
+        ]
+
+
+async def no_cache(collection_name, query, search):
+    return await search()
+
+
+def search(monkeypatch, **kwargs) -> dict:
+    monkeypatch.setattr(qdrant.search_cache, "get_or_search", no_cache)
+    return asyncio.run(
+        qdrant.search_on_vector_db(
+            prompt="Good food",
+            params=ISearchParams(),
+            neural_seacher=FakeSearcher(),
+            current_user=SimpleNamespace(id="user"),
+            **kwargs,
+        )
+    )
+
+
+def test_search_returns_payloads_by_default(monkeypatch):
+    response = search(monkeypatch, with_scores=False)
+    assert response["data"] == [{"page_content": "first"}, {"page_content": "second"}]
+
+
+def test_search_returns_hits_with_scores(monkeypatch):
+    response = search(monkeypatch, with_scores=True)
+    assert [(hit["id"], hit["score"]) for hit in response["data"]] == [
+        (1, 0.9),
+        (2, 0.8),
+    ]
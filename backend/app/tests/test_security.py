@@ -0,0 +1,27 @@
+import asyncio
+from app.core.security import PasswordHashPool, get_password_hash, verify_password
+
+
+def test_pool_spawns_its_workers_on_start():
+    pool = PasswordHashPool(max_workers=2, max_concurrency=4)
+
+    async def run():
+        await pool.start()
+        executor = pool._executor
+        processes = len(executor._processes)
+        hashed = await pool.run(get_password_hash, "secret")
+        checks = await asyncio.gather(
+            pool.run(verify_password, "secret", hashed),
+            pool.run(verify_password, "wrong", hashed),
+        )
+        return executor, processes, checks
+
+    try:
+        executor, processes, checks = asyncio.run(run())
+    finally:
+        pool.shutdown()
+    assert executor._mp_context.get_start_method() == "spawn"
+    assert processes == 2
+    assert checks == [True, False]
+    assert pool.stats()["completed"] == 3
+    assert pool._executor is None
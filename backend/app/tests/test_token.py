@@ -0,0 +1,158 @@
+import asyncio
+from types import SimpleNamespace
+from uuid import uuid4
+from app.crud import user_crud
+from app.crud.base_crud import CRUDBase
+from app.schemas.common_schema import TokenType
+from app.utils.token import (
+    delete_tokens_for_users,
+    get_token_key,
+    get_valid_tokens_for_users,
+    is_token_valid,
+    validate_tokens,
+)
+
+ALICE, BOB, CAROL = uuid4(), uuid4(), uuid4()
+
+
+class FakePipeline:
+    def __init__(self, redis: "FakeRedis"):
+        self.redis = redis
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    def smembers(self, key):
+        self.commands.append(("smembers", key))
+
+    def sismember(self, key, value):
+        self.commands.append(("sismember", key, value))
+
+    async def execute(self):
+        self.redis.round_trips += 1
+        results = []
+        for name, key, *args in self.commands:
+            members = self.redis.sets.get(key, set())
+            results.append(set(members) if name == "smembers" else args[0] in members)
+        return results
+
+
+class FakeRedis:
+    def __init__(self):
+        self.sets: dict[str, set[str]] = {}
+        self.round_trips = 0
+
+    def add(self, user_id, token_type, *tokens):
+        self.sets.setdefault(get_token_key(user_id, token_type), set()).update(tokens)
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    async def sismember(self, key, value):
+        self.round_trips += 1
+        return value in self.sets.get(key, set())
+
+    async def delete(self, *keys):
+        self.round_trips += 1
+        return sum(self.sets.pop(key, None) is not None for key in keys)
+
+
+def make_redis() -> FakeRedis:
+    redis = FakeRedis()
+    redis.add(ALICE, TokenType.ACCESS, "a1", "a2")
+    redis.add(ALICE, TokenType.REFRESH, "ar")
+    redis.add(BOB, TokenType.ACCESS, "b1")
+    return redis
+
+
+def test_get_valid_tokens_for_users_is_one_round_trip():
+    redis = make_redis()
+    tokens = asyncio.run(
+        get_valid_tokens_for_users(redis, [ALICE, BOB, CAROL], TokenType.ACCESS)
+    )
+    assert tokens == {ALICE: {"a1", "a2"}, BOB: {"b1"}, CAROL: set()}
+    assert redis.round_trips == 1
+
+
+def test_validate_tokens_keeps_order():
+    redis = make_redis()
+    pairs = [(BOB, "b1"), (ALICE, "b1"), (ALICE, "a2"), (CAROL, "a1")]
+    assert asyncio.run(validate_tokens(redis, pairs, TokenType.ACCESS)) == [
+        True,
+        False,
+        True,
+        False,
+    ]
+    assert redis.round_trips == 1
+    assert asyncio.run(is_token_valid(redis, ALICE, "ar", TokenType.REFRESH))
+
+
+def test_delete_tokens_for_users_is_one_del():
+    redis = make_redis()
+    deleted = asyncio.run(delete_tokens_for_users(redis, [ALICE, CAROL]))
+    assert deleted == 2
+    assert redis.round_trips == 1
+    assert list(redis.sets) == [get_token_key(BOB, TokenType.ACCESS)]
+
+
+def test_delete_tokens_for_users_by_type_and_empty():
+    redis = make_redis()
+    deleted = asyncio.run(
+        delete_tokens_for_users(redis, [ALICE, BOB], [TokenType.REFRESH])
+    )
+    assert deleted == 1
+    assert asyncio.run(delete_tokens_for_users(redis, [])) == 0
+    assert redis.round_trips == 1
+
+
+class FakeSession:
+    def add(self, obj):
+        pass
+
+    async def commit(self):
+        pass
+
+    async def refresh(self, obj):
+        pass
+
+
+def update_is_active(monkeypatch, is_active: bool) -> FakeRedis:
+    redis = make_redis()
+
+    async def invalidate(*emails):
+        pass
+
+    monkeypatch.setattr(
+        CRUDBase, "get_db", lambda self: SimpleNamespace(session=FakeSession())
+    )
+    monkeypatch.setattr(user_crud.principal_cache, "invalidate", invalidate)
+    monkeypatch.setattr(
+        user_crud, "redis_pool", SimpleNamespace(get_client=lambda: redis)
+    )
+    users = [
+        SimpleNamespace(id=user_id, email=f"{user_id}@example.com", is_active=True)
+        for user_id in (ALICE, BOB)
+    ]
+    asyncio.run(
+        user_crud.user.update_is_active(
+            db_obj=users, obj_in=SimpleNamespace(is_active=is_active)
+        )
+    )
+    assert all(user.is_active is is_active for user in users)
+    return redis
+
+
+def test_deactivation_revokes_every_token_in_one_round_trip(monkeypatch):
+    redis = update_is_active(monkeypatch, is_active=False)
+    assert redis.sets == {}
+    assert redis.round_trips == 1
+
+
+def test_activation_keeps_tokens(monkeypatch):
+    redis = update_is_active(monkeypatch, is_active=True)
+    assert len(redis.sets) == 3
+    assert redis.round_trips == 0
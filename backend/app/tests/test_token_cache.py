@@ -0,0 +1,77 @@
+import pytest
+from app.auth import token_cache
+from app.auth.token_cache import RevocationCheckCache, VerifiedClaimsCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(token_cache.time, "time", clock)
+    monkeypatch.setattr(token_cache.time, "monotonic", clock)
+    return clock
+
+
+def test_claims_are_served_until_exp(clock):
+    cache = VerifiedClaimsCache()
+    claims = {"sub": "alice", "exp": clock.now + 60}
+    cache.set("token", claims)
+
+    clock.now += 60
+    assert cache.get("token") == claims
+    clock.now += 1
+    assert cache.get("token") is None
+    assert cache.cache_info()["size"] == 0
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_cached_claims_cannot_be_modified_by_callers(clock):
+    cache = VerifiedClaimsCache()
+    claims = {"sub": "alice", "exp": clock.now + 60}
+    cache.set("token", claims)
+    claims["sub"] = "mallory"
+    cache.get("token")["sub"] = "mallory"
+    assert cache.get("token")["sub"] == "alice"
+
+
+def test_claims_cache_is_a_bounded_lru(clock):
+    cache = VerifiedClaimsCache(max_size=2)
+    for token in ("a", "b"):
+        cache.set(token, {"sub": token, "exp": clock.now + 60})
+    cache.get("a")
+    cache.set("c", {"sub": "c", "exp": clock.now + 60})
+    assert [cache.get(token) is not None for token in "abc"] == [True, False, True]
+    assert cache.cache_info()["size"] == 2
+
+
+def test_allowed_tokens_are_rechecked_after_the_staleness_window(clock):
+    cache = RevocationCheckCache(staleness_window=60)
+    cache.set("token", True)
+    clock.now += 60
+    assert cache.get("token") is True
+    clock.now += 1
+    assert cache.get("token") is None
+
+
+def test_revoked_tokens_stay_revoked(clock):
+    cache = RevocationCheckCache(staleness_window=60)
+    cache.set("token", False)
+    clock.now += 3600
+    assert cache.get("token") is False
+
+
+def test_revocation_cache_is_a_bounded_lru(clock):
+    cache = RevocationCheckCache(max_size=2)
+    cache.set("a", False)
+    cache.set("b", True)
+    cache.get("a")
+    cache.set("c", True)
+    assert [cache.get(token) for token in "abc"] == [False, None, True]
+    assert cache.cache_info()["size"] == 2
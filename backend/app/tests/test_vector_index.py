@@ -0,0 +1,123 @@
+import numpy as np
+import pytest
+from qdrant_client.http import models
+from app.utils.vector_index import LocalVectorIndex
+
+VECTORS = np.array(
+    [
+        [1.0, 0.0, 0.0],
+        [0.9, 0.1, 0.0],
+        [0.5, 0.5, 0.0],
+        [0.0, 1.0, 0.0],
+        [0.0, 0.0, 1.0],
+    ]
+)
+PAYLOADS = [
+    {"product_id": "a", "score": 5, "tags": ["gdpr", "privacy"]},
+    {"product_id": "b", "score": 3, "tags": ["tax"]},
+    {"product_id": 1, "score": 4.5},
+    {"product_id": True, "score": "high", "tags": [["nested"]]},
+    None,
+]
+
+
+@pytest.fixture
+def index() -> LocalVectorIndex:
+    return LocalVectorIndex(
+        ids=[10, 11, 12, 13, 14],
+        vectors=LocalVectorIndex.normalize(VECTORS),
+        payloads=PAYLOADS,
+    )
+
+
+def search(index, vector=(1.0, 0.2, 0.1), filter=None, **kwargs):
+    request = models.SearchRequest(
+        vector=list(vector),
+        filter=filter,
+        limit=kwargs.pop("limit", 5),
+        with_payload=kwargs.pop("with_payload", False),
+        **kwargs,
+    )
+    return index.search(request)
+
+
+def match(key, **kwargs) -> models.Filter:
+    condition = models.FieldCondition(key=key, **kwargs)
+    return models.Filter(must=[condition])
+
+
+def test_search_ranks_by_cosine_similarity(index):
+    hits = search(index)
+    assert [hit.id for hit in hits] == [11, 10, 12, 13, 14]
+    assert [hit.score for hit in hits] == sorted(
+        (hit.score for hit in hits), reverse=True
+    )
+
+
+def test_search_limit_offset_and_threshold(index):
+    assert [hit.id for hit in search(index, limit=2, offset=1)] == [10, 12]
+    assert [hit.id for hit in search(index, score_threshold=0.7)] == [11, 10, 12]
+
+
+def test_search_batch_keeps_request_order(index):
+    requests = [
+        models.SearchRequest(vector=[0.0, 0.0, 1.0], limit=1),
+        models.SearchRequest(vector=[0.0, 1.0, 0.0], limit=1),
+    ]
+    results = index.search_batch(requests)
+    assert [[hit.id for hit in hits] for hits in results] == [[14], [13]]
+
+
+def test_match_value_does_not_mix_kinds(index):
+    by_string = match("product_id", match=models.MatchValue(value="a"))
+    by_int = match("product_id", match=models.MatchValue(value=1))
+    by_bool = match("product_id", match=models.MatchValue(value=True))
+    assert [hit.id for hit in search(index, filter=by_string)] == [10]
+    assert [hit.id for hit in search(index, filter=by_int)] == [12]
+    assert [hit.id for hit in search(index, filter=by_bool)] == [13]
+
+
+def test_match_any_on_mixed_and_array_payloads(index):
+    by_strings = match("product_id", match=models.MatchAny(any=["b", "1"]))
+    by_tags = match("tags", match=models.MatchAny(any=["privacy", "tax"]))
+    assert [hit.id for hit in search(index, filter=by_strings)] == [11]
+    assert [hit.id for hit in search(index, filter=by_tags)] == [11, 10]
+
+
+def test_range_ignores_non_numbers(index):
+    at_least_four = match("score", range=models.Range(gte=4))
+    assert [hit.id for hit in search(index, filter=at_least_four)] == [10, 12]
+
+
+def test_must_not(index):
+    filter = models.Filter(
+        must_not=[
+            models.FieldCondition(key="tags", match=models.MatchValue(value="tax"))
+        ]
+    )
+    assert [hit.id for hit in search(index, filter=filter)] == [10, 12, 13, 14]
+
+
+def test_payload_projection(index):
+    hits = search(index, limit=1, with_payload=["product_id"])
+    assert hits[0].payload == {"product_id": "b"}
+
+
+def test_retrieve_keeps_id_order_and_filters(index):
+    more_than_three = match("score", range=models.Range(gt=3))
+    records = index.retrieve([12, 99, 10, 11], filter=more_than_three)
+    assert [record.id for record in records] == [12, 10]
+
+
+def test_recommend_excludes_examples(index):
+    request = models.RecommendRequest(positive=[10], limit=2)
+    assert [hit.id for hit in index.recommend(request)] == [11, 12]
+    with pytest.raises(KeyError):
+        index.recommend(models.RecommendRequest(positive=[99], limit=2))
+
+
+def test_snapshot_round_trip(tmp_path, index):
+    LocalVectorIndex.save(str(tmp_path), index.ids, VECTORS, PAYLOADS)
+    loaded = LocalVectorIndex.load(str(tmp_path))
+    assert [hit.id for hit in search(loaded)] == [hit.id for hit in search(index)]
+    assert loaded.payloads == PAYLOADS
@@ -0,0 +1,164 @@
+import asyncio
+import base64
+import io
+from types import SimpleNamespace
+import msgpack
+import numpy as np
+import orjson
+import pytest
+from fastapi import HTTPException
+from app.api.v1.endpoints import openai as openai_endpoints
+from app.utils.vector_response import (
+    JSON_MEDIA_TYPE,
+    NPY_MEDIA_TYPE,
+    OCTET_STREAM_MEDIA_TYPE,
+    VECTOR_MEDIA_TYPES,
+    negotiate_media_type,
+    vector_media_type,
+    vectors_response,
+)
+
+VECTORS = [[0.1, -2.5, 3.0], [1e-8, 0.0, 42.25]]
+EXPECTED = np.array(VECTORS, dtype="<f4")
+
+
+@pytest.mark.parametrize(
+    "accept,media_type",
+    [
+        (None, JSON_MEDIA_TYPE),
+        ("", JSON_MEDIA_TYPE),
+        ("*/*", JSON_MEDIA_TYPE),
+        ("application/x-npy", NPY_MEDIA_TYPE),
+        ("APPLICATION/X-NPY", NPY_MEDIA_TYPE),
+        ("text/html, application/octet-stream", OCTET_STREAM_MEDIA_TYPE),
+        ("application/json;q=0.5, application/x-npy", NPY_MEDIA_TYPE),
+        ("application/x-npy;q=0, */*;q=0.1", JSON_MEDIA_TYPE),
+        (
+            "application/x-msgpack;q=0.9, application/json;q=0.9",
+            "application/x-msgpack",
+        ),
+        ("application/*", JSON_MEDIA_TYPE),
+        ("application/json;q=oops, application/msgpack", "application/msgpack"),
+    ],
+)
+def test_negotiate_media_type(accept, media_type):
+    assert negotiate_media_type(accept, VECTOR_MEDIA_TYPES) == media_type
+
+
+@pytest.mark.parametrize("accept", ["text/html", "image/*", "application/json;q=0"])
+def test_unacceptable_media_type_is_406(accept):
+    assert negotiate_media_type(accept, VECTOR_MEDIA_TYPES) is None
+    with pytest.raises(HTTPException) as error:
+        vector_media_type(accept)
+    assert error.value.status_code == 406
+    assert NPY_MEDIA_TYPE in error.value.detail
+
+
+def test_json_floats_round_trip():
+    response = vectors_response(VECTORS, message="ok", meta={"model": "ada"})
+    assert response.media_type == JSON_MEDIA_TYPE
+    body = orjson.loads(response.body)
+    assert body["message"] == "ok"
+    assert body["meta"] == {"model": "ada"}
+    np.testing.assert_array_equal(np.array(body["data"], dtype="<f4"), EXPECTED)
+
+
+def test_json_base64_round_trip():
+    response = vectors_response(VECTORS, encoding_format="base64")
+    data = orjson.loads(response.body)["data"]
+    decoded = [np.frombuffer(base64.b64decode(vector), dtype="<f4") for vector in data]
+    np.testing.assert_array_equal(np.stack(decoded), EXPECTED)
+
+
+def test_npy_round_trip():
+    response = vectors_response(VECTORS, media_type=NPY_MEDIA_TYPE)
+    matrix = np.load(io.BytesIO(response.body), allow_pickle=False)
+    assert matrix.dtype == np.dtype("<f4")
+    np.testing.assert_array_equal(matrix, EXPECTED)
+
+
+def test_octet_stream_round_trip():
+    response = vectors_response(VECTORS, media_type=OCTET_STREAM_MEDIA_TYPE)
+    assert response.headers["X-Vector-Shape"] == "2,3"
+    matrix = np.frombuffer(response.body, dtype="<f4").reshape(2, 3)
+    np.testing.assert_array_equal(matrix, EXPECTED)
+
+
+@pytest.mark.parametrize("media_type", ["application/msgpack", "application/x-msgpack"])
+def test_msgpack_round_trip(media_type):
+    response = vectors_response(VECTORS, media_type=media_type, message="ok")
+    assert response.media_type == media_type
+    body = msgpack.unpackb(response.body)
+    assert body["message"] == "ok"
+    assert body["meta"] == {}
+    matrix = np.stack([np.frombuffer(vector, dtype="<f4") for vector in body["data"]])
+    np.testing.assert_array_equal(matrix, EXPECTED)
+
+
+def test_empty_matrix():
+    assert orjson.loads(vectors_response([]).body)["data"] == []
+    response = vectors_response([], media_type=OCTET_STREAM_MEDIA_TYPE)
+    assert response.headers["X-Vector-Shape"] == "0,0"
+    assert response.body == b""
+    matrix = np.load(io.BytesIO(vectors_response([], media_type=NPY_MEDIA_TYPE).body))
+    assert matrix.shape == (0, 0)
+
+
+class FakeBatcher:
+    def __init__(self):
+        self.calls = []
+
+    async def embed_chunked(self, texts, model, max_chunk_tokens):
+        self.calls.append(texts)
+        return [[float(len(text)), 0.5] for text in texts]
+
+
+def embed(monkeypatch, accept, **kwargs):
+    batcher = FakeBatcher()
+    monkeypatch.setattr(openai_endpoints, "embedding_batcher", batcher)
+    response = asyncio.run(
+        openai_endpoints.generate_embeddings(
+            body=openai_endpoints.Inputs(prompts=["ab", "cde"], **kwargs),
+            accept=accept,
+            current_user=SimpleNamespace(id="user"),
+            embeddings=SimpleNamespace(document_model_name="ada"),
+        )
+    )
+    return response, batcher
+
+
+def test_embeddings_endpoint_negotiates_msgpack(monkeypatch):
+    response, batcher = embed(monkeypatch, "application/msgpack")
+    assert batcher.calls == [["ab", "cde"]]
+    data = msgpack.unpackb(response.body)["data"]
+    assert [np.frombuffer(vector, dtype="<f4").tolist() for vector in data] == [
+        [2.0, 0.5],
+        [3.0, 0.5],
+    ]
+
+
+def test_embeddings_endpoint_refuses_before_embedding(monkeypatch):
+    with pytest.raises(HTTPException) as error:
+        embed(monkeypatch, "text/csv")
+    assert error.value.status_code == 406
+    assert openai_endpoints.embedding_batcher.calls == []
+
+
+def test_embeddings_endpoint_keeps_prompts_as_sent(monkeypatch):
+    batcher = FakeBatcher()
+    monkeypatch.setattr(openai_endpoints, "embedding_batcher", batcher)
+
+    def embed_prompts(prompts, **kwargs):
+        asyncio.run(
+            openai_endpoints.generate_embeddings(
+                body=openai_endpoints.Inputs(prompts=prompts, **kwargs),
+                accept=None,
+                current_user=SimpleNamespace(id="user"),
+                embeddings=SimpleNamespace(document_model_name="ada"),
+            )
+        )
+        return batcher.calls.pop()
+
+    prompts = ["what  is\nGDPR", "what is GDPR", "what  is\nGDPR"]
+    assert embed_prompts(prompts) == ["what  is GDPR", "what is GDPR", "what  is GDPR"]
+    assert embed_prompts(prompts, normalize=True) == ["what is GDPR"] * 3